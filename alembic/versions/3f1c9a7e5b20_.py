@@ -0,0 +1,36 @@
+"""channel membership and child list indexes
+
+Revision ID: 3f1c9a7e5b20
+Revises: b417ced5ab48
+Create Date: 2026-10-17 10:12:41.204118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a7e5b20'
+down_revision: Union[str, None] = 'b417ced5ab48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_channels_behaviorist_id'), 'channels', ['behaviorist_id'], unique=False)
+    op.create_index(op.f('ix_channels_client_id'), 'channels', ['client_id'], unique=False)
+    op.create_index('ix_posts_channel_id_created_at', 'posts', ['channel_id', 'created_at'], unique=False)
+    op.create_index('ix_comments_post_id_created_at', 'comments', ['post_id', 'created_at'], unique=False)
+    op.create_index('ix_events_channel_id_start_time', 'events', ['channel_id', 'start_time'], unique=False)
+    op.create_index(op.f('ix_media_post_id'), 'media', ['post_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_media_post_id'), table_name='media')
+    op.drop_index('ix_events_channel_id_start_time', table_name='events')
+    op.drop_index('ix_comments_post_id_created_at', table_name='comments')
+    op.drop_index('ix_posts_channel_id_created_at', table_name='posts')
+    op.drop_index(op.f('ix_channels_client_id'), table_name='channels')
+    op.drop_index(op.f('ix_channels_behaviorist_id'), table_name='channels')
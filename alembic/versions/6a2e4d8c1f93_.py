@@ -0,0 +1,37 @@
+"""cascade child rows on channel and post deletes
+
+Revision ID: 6a2e4d8c1f93
+Revises: 3f1c9a7e5b20
+Create Date: 2026-10-17 11:03:27.551902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a2e4d8c1f93'
+down_revision: Union[str, None] = '3f1c9a7e5b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FOREIGN_KEYS = [
+    ('posts_channel_id_fkey', 'posts', 'channels', 'channel_id'),
+    ('events_channel_id_fkey', 'events', 'channels', 'channel_id'),
+    ('comments_post_id_fkey', 'comments', 'posts', 'post_id'),
+    ('media_post_id_fkey', 'media', 'posts', 'post_id'),
+]
+
+
+def upgrade() -> None:
+    for name, source, referent, column in FOREIGN_KEYS:
+        op.drop_constraint(name, source, type_='foreignkey')
+        op.create_foreign_key(name, source, referent, [column], ['id'], ondelete='CASCADE')
+
+
+def downgrade() -> None:
+    for name, source, referent, column in FOREIGN_KEYS:
+        op.drop_constraint(name, source, type_='foreignkey')
+        op.create_foreign_key(name, source, referent, [column], ['id'])
@@ -0,0 +1,31 @@
+"""events during range
+
+Revision ID: a1d4e7c9b352
+Revises: f7c3a1d9e2b6
+Create Date: 2026-10-17 17:11:52.604127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1d4e7c9b352'
+down_revision: Union[str, None] = 'f7c3a1d9e2b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # lets the GiST index cover the varchar channel_id next to the range
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    op.add_column('events', sa.Column('during', postgresql.TSRANGE(), sa.Computed("tsrange(start_time, CASE WHEN rrule IS NULL THEN greatest(end_time, start_time) WHEN recurrence_end IS NULL THEN NULL ELSE greatest(recurrence_end, start_time) END)", persisted=True), nullable=True))
+    op.create_index('ix_events_channel_id_during', 'events', ['channel_id', 'during'], unique=False, postgresql_using='gist')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_events_channel_id_during', table_name='events', postgresql_using='gist')
+    op.drop_column('events', 'during')
@@ -0,0 +1,53 @@
+"""events during covers moved occurrences
+
+Revision ID: a9e3c7f1d5b8
+Revises: f4b9d6a2c8e3
+Create Date: 2026-10-18 10:42:17.305918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9e3c7f1d5b8'
+down_revision: Union[str, None] = 'f4b9d6a2c8e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DURING = "tsrange(least(start_time, moved_start), CASE WHEN rrule IS NULL THEN greatest(end_time, start_time) WHEN recurrence_end IS NULL THEN NULL ELSE greatest(recurrence_end, moved_end, start_time) END, '[]')"
+OLD_DURING = "tsrange(start_time, CASE WHEN rrule IS NULL THEN greatest(end_time, start_time) WHEN recurrence_end IS NULL THEN NULL ELSE greatest(recurrence_end, start_time) END)"
+
+
+def _replace_during(expression: str) -> None:
+    # a generated column's expression cannot be altered in place
+    op.drop_index('ix_events_channel_id_during', table_name='events', postgresql_using='gist')
+    op.drop_column('events', 'during')
+    op.add_column('events', sa.Column('during', postgresql.TSRANGE(), sa.Computed(expression, persisted=True), nullable=True))
+    op.create_index('ix_events_channel_id_during', 'events', ['channel_id', 'during'], unique=False, postgresql_using='gist')
+
+
+def upgrade() -> None:
+    op.add_column('events', sa.Column('moved_start', sa.DateTime(), nullable=True))
+    op.add_column('events', sa.Column('moved_end', sa.DateTime(), nullable=True))
+    op.execute("""
+        UPDATE events
+        SET moved_start = moved.start_time, moved_end = moved.end_time
+        FROM (
+            SELECT event_id, min(start_time) AS start_time, max(end_time) AS end_time
+            FROM event_exceptions
+            WHERE NOT cancelled
+            GROUP BY event_id
+        ) AS moved
+        WHERE moved.event_id = events.id AND events.rrule IS NOT NULL
+    """)
+    _replace_during(DURING)
+
+
+def downgrade() -> None:
+    _replace_during(OLD_DURING)
+    op.drop_column('events', 'moved_end')
+    op.drop_column('events', 'moved_start')
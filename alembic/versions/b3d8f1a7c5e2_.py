@@ -0,0 +1,35 @@
+"""pending uploads
+
+Revision ID: b3d8f1a7c5e2
+Revises: a9e3c7f1d5b8
+Create Date: 2026-10-18 11:27:40.518263
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d8f1a7c5e2'
+down_revision: Union[str, None] = 'a9e3c7f1d5b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('pending_uploads',
+    sa.Column('object_name', sa.String(), nullable=False),
+    sa.Column('post_id', sa.String(), nullable=False),
+    sa.Column('created_by', sa.String(), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('object_name')
+    )
+    op.create_index(op.f('ix_pending_uploads_expires_at'), 'pending_uploads', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_pending_uploads_expires_at'), table_name='pending_uploads')
+    op.drop_table('pending_uploads')
@@ -0,0 +1,26 @@
+"""media variants
+
+Revision ID: b8f2c6d1e4a7
+Revises: a1d4e7c9b352
+Create Date: 2026-10-17 18:05:31.227496
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8f2c6d1e4a7'
+down_revision: Union[str, None] = 'a1d4e7c9b352'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('media', sa.Column('variants', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('media', 'variants')
@@ -0,0 +1,36 @@
+"""media objects
+
+Revision ID: c2e9a5f7b1d3
+Revises: b8f2c6d1e4a7
+Create Date: 2026-10-17 18:52:09.381540
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2e9a5f7b1d3'
+down_revision: Union[str, None] = 'b8f2c6d1e4a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('media_objects',
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('sha256', sa.String(), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('content_type', sa.String(), nullable=True),
+    sa.Column('ref_count', sa.Integer(), server_default='1', nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index(op.f('ix_media_file_path'), 'media', ['file_path'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_media_file_path'), table_name='media')
+    op.drop_table('media_objects')
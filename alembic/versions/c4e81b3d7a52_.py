@@ -0,0 +1,71 @@
+"""channel version counter
+
+Revision ID: c4e81b3d7a52
+Revises: 9b7d2f4e6a18
+Create Date: 2026-10-17 14:02:48.671330
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e81b3d7a52'
+down_revision: Union[str, None] = '9b7d2f4e6a18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# statement-level triggers bump each touched channel once per statement,
+# however many rows a bulk write changes
+TRIGGER_FUNCTIONS = {
+    'bump_channel_version_by_channel': (
+        'SELECT DISTINCT channel_id FROM changed_rows'
+    ),
+    'bump_channel_version_by_post': (
+        'SELECT DISTINCT posts.channel_id FROM changed_rows '
+        'JOIN posts ON posts.id = changed_rows.post_id'
+    ),
+}
+TRIGGERS = [
+    ('posts', 'bump_channel_version_by_channel'),
+    ('events', 'bump_channel_version_by_channel'),
+    ('comments', 'bump_channel_version_by_post'),
+    ('media', 'bump_channel_version_by_post'),
+]
+OPERATIONS = [('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')]
+
+
+def upgrade() -> None:
+    op.add_column('channels', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('channels', sa.Column('last_activity_at', sa.DateTime(), nullable=True))
+    for name, channel_ids in TRIGGER_FUNCTIONS.items():
+        op.execute(f"""
+            CREATE FUNCTION {name}() RETURNS trigger AS $$
+            BEGIN
+                UPDATE channels
+                SET version = version + 1, last_activity_at = now()
+                WHERE id IN ({channel_ids});
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+    for table, function in TRIGGERS:
+        for operation, transition in OPERATIONS:
+            op.execute(f"""
+                CREATE TRIGGER {table}_{operation.lower()}_bump_channel_version
+                AFTER {operation} ON {table}
+                REFERENCING {transition} TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION {function}()
+            """)
+
+
+def downgrade() -> None:
+    for table, function in TRIGGERS:
+        for operation, transition in OPERATIONS:
+            op.execute(f'DROP TRIGGER {table}_{operation.lower()}_bump_channel_version ON {table}')
+    for name in TRIGGER_FUNCTIONS:
+        op.execute(f'DROP FUNCTION {name}()')
+    op.drop_column('channels', 'last_activity_at')
+    op.drop_column('channels', 'version')
@@ -0,0 +1,27 @@
+"""channel tombstone members
+
+Revision ID: c6a2f8d4e1b7
+Revises: b3d8f1a7c5e2
+Create Date: 2026-10-18 12:03:52.114870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6a2f8d4e1b7'
+down_revision: Union[str, None] = 'b3d8f1a7c5e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('tombstones', sa.Column('member_ids', postgresql.ARRAY(sa.String()), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('tombstones', 'member_ids')
@@ -0,0 +1,86 @@
+"""channel version on changed rows
+
+Revision ID: d7b3e9f2a6c4
+Revises: c2e9a5f7b1d3
+Create Date: 2026-10-17 21:36:52.118407
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7b3e9f2a6c4'
+down_revision: Union[str, None] = 'c2e9a5f7b1d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Each written row is stamped with the channel version its statement will
+# produce. The channel row is locked first, and the lock is held until commit,
+# so a writer only sees version n once the writer of n - 1 has committed:
+# version order is commit order, unlike timestamps.
+STAMP_FUNCTIONS = {
+    'stamp_channel_version_by_channel': (
+        'SELECT version + 1 INTO NEW.channel_version FROM channels '
+        'WHERE id = NEW.channel_id FOR UPDATE'
+    ),
+    'stamp_channel_version_by_post': (
+        'SELECT channels.version + 1 INTO NEW.channel_version FROM channels '
+        'JOIN posts ON posts.channel_id = channels.id '
+        'WHERE posts.id = NEW.post_id FOR UPDATE OF channels'
+    ),
+}
+STAMPED_TABLES = [
+    ('posts', 'channel_id', 'stamp_channel_version_by_channel'),
+    ('events', 'channel_id', 'stamp_channel_version_by_channel'),
+    ('tombstones', 'channel_id', 'stamp_channel_version_by_channel'),
+    ('comments', 'post_id', 'stamp_channel_version_by_post'),
+    ('media', 'post_id', 'stamp_channel_version_by_post'),
+]
+
+
+def upgrade() -> None:
+    for table, parent, _ in STAMPED_TABLES:
+        op.add_column(table, sa.Column('channel_version', sa.Integer(), server_default='0', nullable=False))
+        op.create_index(f'ix_{table}_{parent}_channel_version', table, [parent, 'channel_version'], unique=False)
+    op.drop_index('ix_tombstones_channel_id_deleted_at', table_name='tombstones')
+    for name, stamp in STAMP_FUNCTIONS.items():
+        op.execute(f"""
+            CREATE FUNCTION {name}() RETURNS trigger AS $$
+            BEGIN
+                {stamp};
+                IF NOT FOUND THEN
+                    -- the tombstone of a deleted channel
+                    NEW.channel_version := 0;
+                END IF;
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+    for table, _, function in STAMPED_TABLES:
+        op.execute(f"""
+            CREATE TRIGGER {table}_stamp_channel_version
+            BEFORE INSERT OR UPDATE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION {function}()
+        """)
+    # deletions bump the version like any other change
+    op.execute("""
+        CREATE TRIGGER tombstones_insert_bump_channel_version
+        AFTER INSERT ON tombstones
+        REFERENCING NEW TABLE AS changed_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_channel_version_by_channel()
+    """)
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER tombstones_insert_bump_channel_version ON tombstones')
+    for table, _, _ in STAMPED_TABLES:
+        op.execute(f'DROP TRIGGER {table}_stamp_channel_version ON {table}')
+    for name in STAMP_FUNCTIONS:
+        op.execute(f'DROP FUNCTION {name}()')
+    op.create_index('ix_tombstones_channel_id_deleted_at', 'tombstones', ['channel_id', 'deleted_at'], unique=False)
+    for table, parent, _ in STAMPED_TABLES:
+        op.drop_index(f'ix_{table}_{parent}_channel_version', table_name=table)
+        op.drop_column(table, 'channel_version')
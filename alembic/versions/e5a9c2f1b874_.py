@@ -0,0 +1,35 @@
+"""tombstones
+
+Revision ID: e5a9c2f1b874
+Revises: c4e81b3d7a52
+Create Date: 2026-10-17 14:47:19.305812
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a9c2f1b874'
+down_revision: Union[str, None] = 'c4e81b3d7a52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('tombstones',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('channel_id', sa.String(), nullable=False),
+    sa.Column('entity_type', sa.String(), nullable=False),
+    sa.Column('entity_id', sa.String(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_tombstones_channel_id_deleted_at', 'tombstones', ['channel_id', 'deleted_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tombstones_channel_id_deleted_at', table_name='tombstones')
+    op.drop_table('tombstones')
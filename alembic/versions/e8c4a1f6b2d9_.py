@@ -0,0 +1,35 @@
+"""feed tokens
+
+Revision ID: e8c4a1f6b2d9
+Revises: d7b3e9f2a6c4
+Create Date: 2026-10-17 22:18:05.640213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8c4a1f6b2d9'
+down_revision: Union[str, None] = 'd7b3e9f2a6c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('feed_tokens',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('token_hash', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('token_hash')
+    )
+    op.create_index(op.f('ix_feed_tokens_user_id'), 'feed_tokens', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_feed_tokens_user_id'), table_name='feed_tokens')
+    op.drop_table('feed_tokens')
@@ -0,0 +1,68 @@
+"""media object references
+
+Revision ID: f4b9d6a2c8e3
+Revises: e8c4a1f6b2d9
+Create Date: 2026-10-17 23:05:41.902376
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b9d6a2c8e3'
+down_revision: Union[str, None] = 'e8c4a1f6b2d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# ref_count follows the media rows themselves, so deletes that cascade from
+# posts and channels release their objects too; objects left at zero are
+# removed by the media GC
+REF_COUNT_TRIGGERS = [('INSERT', 'NEW', '+'), ('DELETE', 'OLD', '-')]
+
+
+def upgrade() -> None:
+    op.alter_column('media_objects', 'sha256', existing_type=sa.String(), nullable=True)
+    op.alter_column('media_objects', 'size', existing_type=sa.BigInteger(), nullable=True)
+    op.alter_column('media_objects', 'ref_count', existing_type=sa.Integer(), server_default='0')
+    # objects stored before deduplication or through presigned uploads
+    op.execute("""
+        INSERT INTO media_objects (key)
+        SELECT DISTINCT file_path FROM media
+        ON CONFLICT (key) DO NOTHING
+    """)
+    op.execute("""
+        UPDATE media_objects
+        SET ref_count = (SELECT count(*) FROM media WHERE media.file_path = media_objects.key)
+    """)
+    for operation, transition, sign in REF_COUNT_TRIGGERS:
+        op.execute(f"""
+            CREATE FUNCTION media_{operation.lower()}_count_refs() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO media_objects AS objects (key, ref_count)
+                SELECT file_path, {sign}count(*) FROM changed_rows
+                GROUP BY file_path ORDER BY file_path
+                ON CONFLICT (key) DO UPDATE
+                SET ref_count = objects.ref_count + EXCLUDED.ref_count;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+        op.execute(f"""
+            CREATE TRIGGER media_{operation.lower()}_count_refs
+            AFTER {operation} ON media
+            REFERENCING {transition} TABLE AS changed_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION media_{operation.lower()}_count_refs()
+        """)
+
+
+def downgrade() -> None:
+    for operation, _, _ in REF_COUNT_TRIGGERS:
+        op.execute(f'DROP TRIGGER media_{operation.lower()}_count_refs ON media')
+        op.execute(f'DROP FUNCTION media_{operation.lower()}_count_refs()')
+    op.execute('DELETE FROM media_objects WHERE sha256 IS NULL OR ref_count <= 0')
+    op.alter_column('media_objects', 'ref_count', existing_type=sa.Integer(), server_default='1')
+    op.alter_column('media_objects', 'size', existing_type=sa.BigInteger(), nullable=False)
+    op.alter_column('media_objects', 'sha256', existing_type=sa.String(), nullable=False)
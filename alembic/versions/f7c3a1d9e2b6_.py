@@ -0,0 +1,41 @@
+"""recurring events
+
+Revision ID: f7c3a1d9e2b6
+Revises: e5a9c2f1b874
+Create Date: 2026-10-17 16:02:44.918203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7c3a1d9e2b6'
+down_revision: Union[str, None] = 'e5a9c2f1b874'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('events', sa.Column('rrule', sa.String(), nullable=True))
+    op.add_column('events', sa.Column('recurrence_end', sa.DateTime(), nullable=True))
+    op.create_table('event_exceptions',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('event_id', sa.String(), nullable=False),
+    sa.Column('original_start', sa.DateTime(), nullable=False),
+    sa.Column('cancelled', sa.Boolean(), server_default='false', nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=True),
+    sa.Column('end_time', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['event_id'], ['events.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('event_id', 'original_start')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('event_exceptions')
+    op.drop_column('events', 'recurrence_end')
+    op.drop_column('events', 'rrule')
@@ -0,0 +1,34 @@
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, select
+
+from app.models import Channel
+
+
+def channel_member(user_sub: str):
+    return or_(Channel.behaviorist_id == user_sub, Channel.client_id == user_sub)
+
+
+def accessible_channel(channel_id: str, user_sub: str):
+    return and_(Channel.id == channel_id, channel_member(user_sub))
+
+
+def channel_children(model, channel_id: str, user_sub: str, *criteria):
+    """Select `(Channel.id, child)` rows for a channel the user belongs to.
+
+    The channel is outer-joined with its children, so the membership check and
+    the data load share one round trip: no rows means the channel is missing or
+    not accessible, a single `(id, None)` row means it has no matching children.
+    Extra `criteria` (e.g. keyset filters) apply to the join, not the channel.
+    """
+    return (
+        select(Channel.id, model)
+        .select_from(Channel)
+        .outerjoin(model, and_(model.channel_id == Channel.id, *criteria))
+        .where(accessible_channel(channel_id, user_sub))
+    )
+
+
+def children_or_404(rows) -> list:
+    if not rows:
+        raise HTTPException(status_code=404, detail="Channel not found")
+    return [child for _, child in rows if child is not None]
@@ -0,0 +1,176 @@
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import HTTPException
+from prometheus_client import Counter, Gauge
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models import Channel, Post
+
+ACL_CACHE_TTL = float(os.getenv("ACL_CACHE_TTL", "60"))
+ACL_CACHE_SIZE = int(os.getenv("ACL_CACHE_SIZE", "50000"))
+# e.g. redis://redis:6379/0 to share decisions between workers
+ACL_CACHE_URL = os.getenv("ACL_CACHE_URL", "")
+
+logger = logging.getLogger(__name__)
+
+acl_cache_requests = Counter(
+    "acl_cache_requests_total", "Channel access cache lookups", ["kind", "result"]
+)
+
+
+class MemoryBackend:
+    """Per-process LRU with a TTL on every entry."""
+
+    def __init__(self, maxsize: int = ACL_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._entries.pop(key, None)
+
+
+class RedisBackend:
+    """Store shared by all workers; needs the `redis` package installed."""
+
+    def __init__(self, url: str, prefix: str = "acl:"):
+        import redis.asyncio as redis
+
+        self.prefix = prefix
+        self._client = redis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._client.get(self.prefix + key)
+
+    async def set(self, key: str, value: str, ttl: float):
+        await self._client.set(self.prefix + key, value, ex=max(int(ttl), 1))
+
+    async def delete(self, *keys: str):
+        await self._client.delete(*(self.prefix + key for key in keys))
+
+
+class ChannelAccessCache:
+    """Caches channel members and post -> channel ids for membership checks.
+
+    Membership is decided from the cached (behaviorist_id, client_id) pair of a
+    channel, so invalidating a channel is a single key delete on any backend.
+    """
+
+    def __init__(self, backend, ttl: float = ACL_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    async def _get(self, kind: str, key: str) -> Optional[str]:
+        try:
+            value = await self.backend.get(key)
+        except Exception:
+            logger.warning("ACL cache read failed", exc_info=True)
+            value = None
+        if value is None:
+            self.misses += 1
+            acl_cache_requests.labels(kind, "miss").inc()
+        else:
+            self.hits += 1
+            acl_cache_requests.labels(kind, "hit").inc()
+        return value
+
+    async def _set(self, key: str, value: str):
+        try:
+            await self.backend.set(key, value, self.ttl)
+        except Exception:
+            logger.warning("ACL cache write failed", exc_info=True)
+
+    async def channel_members(self, db: AsyncSession, channel_id: str):
+        key = f"channel:{channel_id}"
+        cached = await self._get("channel", key)
+        if cached is not None:
+            return tuple(json.loads(cached))
+        result = await db.execute(
+            select(Channel.behaviorist_id, Channel.client_id).where(
+                Channel.id == channel_id
+            )
+        )
+        row = result.first()
+        if row is None:
+            return None
+        members = (row.behaviorist_id, row.client_id)
+        await self._set(key, json.dumps(members))
+        return members
+
+    async def post_channel(self, db: AsyncSession, post_id: str) -> Optional[str]:
+        key = f"post:{post_id}"
+        cached = await self._get("post", key)
+        if cached is not None:
+            return cached
+        result = await db.execute(select(Post.channel_id).where(Post.id == post_id))
+        channel_id = result.scalar()
+        if channel_id is not None:
+            await self._set(key, channel_id)
+        return channel_id
+
+    async def is_member(self, db: AsyncSession, user_sub: str, channel_id: str) -> bool:
+        members = await self.channel_members(db, channel_id)
+        return members is not None and user_sub in members
+
+    async def require_channel(self, db: AsyncSession, user_sub: str, channel_id: str):
+        if not await self.is_member(db, user_sub, channel_id):
+            raise HTTPException(status_code=404, detail="Channel not found")
+
+    async def require_post(self, db: AsyncSession, user_sub: str, post_id: str) -> str:
+        """Return the post's channel id if the user may access the post."""
+        channel_id = await self.post_channel(db, post_id)
+        if channel_id is None or not await self.is_member(db, user_sub, channel_id):
+            raise HTTPException(status_code=404, detail="Post not found")
+        return channel_id
+
+    async def remember_post(self, post_id: str, channel_id: str):
+        await self._set(f"post:{post_id}", channel_id)
+
+    async def invalidate_channel(self, channel_id: str):
+        try:
+            await self.backend.delete(f"channel:{channel_id}")
+        except Exception:
+            logger.warning("ACL cache invalidation failed", exc_info=True)
+
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+acl_cache = ChannelAccessCache(
+    RedisBackend(ACL_CACHE_URL) if ACL_CACHE_URL else MemoryBackend()
+)
+
+acl_cache_hit_ratio = Gauge(
+    "acl_cache_hit_ratio", "Share of channel access lookups served from cache"
+)
+acl_cache_hit_ratio.set_function(acl_cache.hit_ratio)
+
+
+def get_acl_cache():
+    return acl_cache
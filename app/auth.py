@@ -1,24 +1,56 @@
+import asyncio
 import os
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+from jose import JWTError, jwk, jwt
+
+from app.jwks import get_signing_key, jwks_configured
+from app.token_cache import token_cache
 
-KEYCLOAK_CLIENT_PUBLIC_KEY = os.getenv("KEYCLOAK_CLIENT_PUBLIC_KEY", "")
+KEYCLOAK_CLIENT_PUBLIC_KEY = os.getenv("KEYCLOAK_CLIENT_PUBLIC_KEY") or (
+    "MIIBIjANBgkqhkiG9w0BAQEFAAOCAQ8AMIIBCgKCAQEAx3V7fKMuAO055R158iL18lehMdjFOZr1P7tmvrbQK3v/9hgbB6ROhOAmT1Aj+ml7rNMb+eMeJEPvDuE5sQm9hMUAU88bWC/pqWyCIegEEWEixeItUrBZLxEsmWagF5wFc90juNxu0qXEf2r/oKuRSdWuJXRx4IRkZm24XzlTLI/z7DZUvRL3t4e/XpnLgb8dVRw/xSmrqAFnbXbRaESDpp77KhTKlhxkVBiT5rBKRwAwI3a7kEYEFtvX3wpRimGPOh/uogtbHn1wKPmFLfpcchu6eIozvWTcVPkfPPSqOwS7HyYlHUdMS+MSjKlmM9dBCh81kgxRWbXLkz0vf6dQ3QIDAQAB"
+)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+# for endpoints that accept other credentials when there is no bearer token
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
+
+def load_public_key(encoded_key: str):
+    pem = (
+        "-----BEGIN PUBLIC KEY-----\n"
+        + encoded_key
+        + "\n-----END PUBLIC KEY-----"
+    )
+    return jwk.construct(pem, algorithm="RS256")
 
 
-def verify_token(token: str = Depends(oauth2_scheme)):
+# parsed once at import, so requests only pay for the signature check
+public_key = load_public_key(KEYCLOAK_CLIENT_PUBLIC_KEY)
+
+
+async def verify_token(token: str = Depends(oauth2_scheme)):
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
     try:
-        print("TOKEN", KEYCLOAK_CLIENT_PUBLIC_KEY)
-        public_key = (
-            "-----BEGIN PUBLIC KEY-----\n"
-            + "MIIBIjANBgkqhkiG9w0BAQEFAAOCAQ8AMIIBCgKCAQEAx3V7fKMuAO055R158iL18lehMdjFOZr1P7tmvrbQK3v/9hgbB6ROhOAmT1Aj+ml7rNMb+eMeJEPvDuE5sQm9hMUAU88bWC/pqWyCIegEEWEixeItUrBZLxEsmWagF5wFc90juNxu0qXEf2r/oKuRSdWuJXRx4IRkZm24XzlTLI/z7DZUvRL3t4e/XpnLgb8dVRw/xSmrqAFnbXbRaESDpp77KhTKlhxkVBiT5rBKRwAwI3a7kEYEFtvX3wpRimGPOh/uogtbHn1wKPmFLfpcchu6eIozvWTcVPkfPPSqOwS7HyYlHUdMS+MSjKlmM9dBCh81kgxRWbXLkz0vf6dQ3QIDAQAB"
-            + "\n-----END PUBLIC KEY-----"
-        )
-        decoded_token = jwt.decode(
-            token, public_key, algorithms=["RS256"], options={"verify_aud": False}
+        kid = jwt.get_unverified_header(token).get("kid")
+        if jwks_configured():
+            signing_key = await get_signing_key(kid)
+            if signing_key is None:
+                raise JWTError(f"Unknown signing key {kid!r}")
+        else:
+            signing_key = public_key
+        # the RSA check is the expensive part; keep it off the event loop
+        decoded_token = await asyncio.to_thread(
+            jwt.decode,
+            token,
+            signing_key,
+            algorithms=["RS256"],
+            options={"verify_aud": False},
         )
+        token_cache.set(token, decoded_token)
         return decoded_token
 
     except JWTError as e:
@@ -0,0 +1,235 @@
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections import OrderedDict, defaultdict, deque
+from typing import List, Optional
+
+import asyncpg
+
+from app.db import DATABASE_URL
+from app.realtime import Hub, get_hub
+
+# "postgres" fans out across workers with LISTEN/NOTIFY, "memory" stays in-process;
+# Postgres is the default wherever the database is, so workers never silently diverge
+BROADCAST_BACKEND = os.getenv(
+    "BROADCAST_BACKEND",
+    "postgres" if DATABASE_URL.startswith("postgresql") else "memory",
+)
+BROADCAST_PG_CHANNEL = os.getenv("BROADCAST_PG_CHANNEL", "channel_events")
+BROADCAST_FLUSH_INTERVAL = float(os.getenv("BROADCAST_FLUSH_INTERVAL", "0.05"))
+BROADCAST_KEEPALIVE_INTERVAL = float(os.getenv("BROADCAST_KEEPALIVE_INTERVAL", "30"))
+REPLAY_BUFFER_SIZE = int(os.getenv("REPLAY_BUFFER_SIZE", "200"))
+REPLAY_MAX_CHANNELS = int(os.getenv("REPLAY_MAX_CHANNELS", "10000"))
+# NOTIFY payloads are capped at 8000 bytes
+NOTIFY_PAYLOAD_LIMIT = 7900
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayBuffer:
+    """The last few messages of each channel, for clients resuming by id."""
+
+    def __init__(self, size: int = REPLAY_BUFFER_SIZE, max_channels: int = REPLAY_MAX_CHANNELS):
+        self.size = size
+        self.max_channels = max_channels
+        self._buffers: "OrderedDict[str, deque]" = OrderedDict()
+
+    def add(self, channel_id: str, message: dict) -> bool:
+        """Buffer `message`; False if a message with its id already was."""
+        buffer = self._buffers.get(channel_id)
+        if buffer is None:
+            buffer = self._buffers[channel_id] = deque(maxlen=self.size)
+            while len(self._buffers) > self.max_channels:
+                self._buffers.popitem(last=False)
+        self._buffers.move_to_end(channel_id)
+        if any(buffered["id"] == message["id"] for buffered in buffer):
+            return False
+        buffer.append(message)
+        return True
+
+    def since(self, channel_id: str, last_id: str) -> Optional[List[dict]]:
+        """Messages after `last_id`, or None when it is no longer buffered."""
+        buffer = self._buffers.get(channel_id, ())
+        messages = list(buffer)
+        for position, message in enumerate(messages):
+            if message["id"] == last_id:
+                return messages[position + 1 :]
+        return None
+
+
+class LocalBroadcast:
+    """Delivers published messages to subscribers of this process only."""
+
+    def __init__(self, hub: Hub, replay: ReplayBuffer):
+        self.hub = hub
+        self.replay = replay
+
+    @staticmethod
+    def stamp(message: dict) -> dict:
+        return {"id": uuid.uuid4().hex, **message}
+
+    def publish(self, channel_id: str, message: dict):
+        self.deliver(channel_id, [self.stamp(message)])
+
+    def deliver(self, channel_id: str, messages: List[dict]):
+        for message in messages:
+            # a batch delivered locally after a failed NOTIFY may still arrive
+            # from the listener, in full or in part
+            if self.replay.add(channel_id, message):
+                self.hub.publish(channel_id, message)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+def _payloads(channel_id: str, messages: List[dict]) -> List[str]:
+    """Pack messages into as few NOTIFY payloads as the size limit allows."""
+    payloads, batch = [], []
+
+    def encode(batch):
+        return json.dumps({"channel_id": channel_id, "messages": batch})
+
+    for message in messages:
+        if len(encode([message]).encode()) > NOTIFY_PAYLOAD_LIMIT:
+            # too big to broadcast; subscribers refetch the referenced row
+            data = message.get("data") or {}
+            message = {
+                "id": message["id"],
+                "type": message["type"],
+                "channel_id": channel_id,
+                "data": {"id": data.get("id")},
+                "truncated": True,
+            }
+        if batch and len(encode(batch + [message]).encode()) > NOTIFY_PAYLOAD_LIMIT:
+            payloads.append(encode(batch))
+            batch = []
+        batch.append(message)
+    if batch:
+        payloads.append(encode(batch))
+    return payloads
+
+
+class PostgresBroadcast(LocalBroadcast):
+    """Cross-worker fan-out over Postgres LISTEN/NOTIFY.
+
+    Messages are batched per channel for a few milliseconds before NOTIFY, and
+    every worker, the publisher included, delivers them from its listener so
+    all workers see the same order. The connection is re-established with
+    backoff; subscribers are told to resync after a gap.
+    """
+
+    def __init__(
+        self,
+        hub: Hub,
+        replay: ReplayBuffer,
+        dsn: str,
+        flush_interval: float = BROADCAST_FLUSH_INTERVAL,
+    ):
+        super().__init__(hub, replay)
+        self.dsn = dsn
+        self.flush_interval = flush_interval
+        self._pending = defaultdict(list)
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._connection: Optional[asyncpg.Connection] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def publish(self, channel_id: str, message: dict):
+        self._pending[channel_id].append(self.stamp(message))
+        self._wakeup.set()
+
+    async def start(self):
+        self._tasks = [
+            asyncio.create_task(self._listen()),
+            asyncio.create_task(self._flush_loop()),
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        data = json.loads(payload)
+        self.deliver(data["channel_id"], data["messages"])
+
+    async def _listen(self):
+        backoff, connected_before = 1, False
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                await connection.add_listener(BROADCAST_PG_CHANNEL, self._on_notify)
+                self._connection, backoff = connection, 1
+                if connected_before:
+                    # notifications sent while we were away are gone
+                    for channel_id in self.hub.channel_ids():
+                        self.hub.publish(
+                            channel_id, {"type": "resync", "channel_id": channel_id}
+                        )
+                connected_before = True
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(
+                            lost.wait(), timeout=BROADCAST_KEEPALIVE_INTERVAL
+                        )
+                    except asyncio.TimeoutError:
+                        async with self._lock:
+                            await connection.execute("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Broadcast listener connection failed", exc_info=True)
+            finally:
+                self._connection = None
+                if connection is not None and not connection.is_closed():
+                    connection.terminate()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+    async def _flush_loop(self):
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.flush_interval)
+            self._wakeup.clear()
+            pending, self._pending = self._pending, defaultdict(list)
+            for channel_id, messages in pending.items():
+                await self._notify(channel_id, messages)
+
+    async def _notify(self, channel_id: str, messages: List[dict]):
+        connection = self._connection
+        try:
+            if connection is None:
+                raise ConnectionError("broadcast connection is down")
+            async with self._lock:
+                for payload in _payloads(channel_id, messages):
+                    await connection.execute(
+                        "SELECT pg_notify($1, $2)", BROADCAST_PG_CHANNEL, payload
+                    )
+        except Exception:
+            # other workers miss these, but local subscribers still get them
+            logger.warning("Broadcast NOTIFY failed, delivering locally", exc_info=True)
+            self.deliver(channel_id, messages)
+
+
+def _asyncpg_dsn(url: str) -> str:
+    return url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+replay_buffer = ReplayBuffer()
+
+if BROADCAST_BACKEND == "postgres":
+    broadcast = PostgresBroadcast(get_hub(), replay_buffer, _asyncpg_dsn(DATABASE_URL))
+else:
+    broadcast = LocalBroadcast(get_hub(), replay_buffer)
+
+
+def get_broadcast():
+    return broadcast
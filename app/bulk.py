@@ -0,0 +1,50 @@
+import os
+import uuid
+from typing import Any, Dict, Generic, List, Tuple, TypeVar
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "500"))
+
+T = TypeVar("T")
+
+
+class BulkItemError(BaseModel):
+    index: int
+    detail: Any
+
+
+class BulkResult(BaseModel, Generic[T]):
+    items: List[T]
+    errors: List[BulkItemError] = []
+
+
+def validate_items(schema, raw_items: List[Dict[str, Any]]):
+    """Split request items into `(index, model)` pairs and per-item errors."""
+    valid: List[Tuple[int, Any]] = []
+    errors: List[dict] = []
+    for index, raw in enumerate(raw_items):
+        try:
+            valid.append((index, schema.model_validate(raw)))
+        except ValidationError as e:
+            detail = e.errors(
+                include_url=False, include_input=False, include_context=False
+            )
+            errors.append({"index": index, "detail": detail})
+    return valid, errors
+
+
+async def insert_returning(db: AsyncSession, model, rows: List[dict]) -> list:
+    """Insert `rows` with multi-row INSERT ... RETURNING, in input order.
+
+    Ids are assigned here, so returned rows map back to their inputs without
+    asking Postgres to preserve the VALUES order.
+    """
+    if not rows:
+        return []
+    rows = [{"id": str(uuid.uuid4()), **row} for row in rows]
+    result = await db.scalars(insert(model).returning(model), rows)
+    by_id = {obj.id: obj for obj in result.all()}
+    return [by_id[row["id"]] for row in rows]
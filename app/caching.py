@@ -0,0 +1,41 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Response
+from sqlalchemy import select
+
+from app.access import accessible_channel
+from app.models import Channel
+
+
+def weak_etag(*parts) -> str:
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against `etag`."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def channel_version(channel_id: str, user_sub: Optional[str] = None):
+    """Select the channel's version; with `user_sub`, only if the user is a member.
+
+    The version changes on every write to the channel or its children, so it
+    validates any response derived from them.
+    """
+    if user_sub is None:
+        return select(Channel.version).where(Channel.id == channel_id)
+    return select(Channel.version).where(accessible_channel(channel_id, user_sub))
@@ -0,0 +1,10 @@
+import os
+from elasticsearch import AsyncElasticsearch
+
+ELASTICSEARCH_HOST = os.getenv("ELASTICSEARCH_HOST", "http://elasticsearch:9200")
+
+es = AsyncElasticsearch(hosts=[ELASTICSEARCH_HOST])
+
+
+def get_es_client():
+    return es
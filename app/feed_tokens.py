@@ -0,0 +1,52 @@
+"""Long-lived, revocable keys for calendar subscriptions.
+
+Calendar apps subscribe by URL and cannot send an Authorization header, and an
+access token in the URL would expire within minutes. Feeds therefore also take
+a random per-user key as `?key=`. Only its hash is stored, and deleting it
+revokes every subscription using it.
+"""
+import hashlib
+import secrets
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.auth import optional_oauth2_scheme, verify_token
+from app.db import get_db
+from app.models import FeedToken
+
+FEED_TOKEN_BYTES = 32
+
+
+def new_feed_token() -> str:
+    return secrets.token_urlsafe(FEED_TOKEN_BYTES)
+
+
+def hash_feed_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def get_feed_user(
+    key: Optional[str] = Query(None),
+    bearer: Optional[str] = Depends(optional_oauth2_scheme),
+    db: AsyncSession = Depends(get_db),
+):
+    """The user of a feed request, from a bearer token or a feed key."""
+    if bearer is not None:
+        return await verify_token(bearer)
+    if key is not None:
+        result = await db.execute(
+            select(FeedToken.user_id).where(
+                FeedToken.token_hash == hash_feed_token(key)
+            )
+        )
+        user_id = result.scalar()
+        if user_id is not None:
+            return {"sub": user_id}
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Not authenticated",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
@@ -1,6 +1,138 @@
 from datetime import datetime
+from typing import Iterable, Iterator, Optional
 import uuid
 
+CRLF = "\r\n"
+PRODID = "-//PAW CONNEct//Paw Connect//EN"
+# RFC 5545 3.1: lines SHOULD NOT be longer than 75 octets, excluding the CRLF
+MAX_LINE_OCTETS = 75
+
+
+def escape_text(value: Optional[str]) -> str:
+    """Escape a TEXT property value (RFC 5545 3.3.11)."""
+    if not value:
+        return ""
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold_line(line: str) -> str:
+    """Fold a content line into 75-octet pieces without splitting UTF-8 characters."""
+    if len(line.encode()) <= MAX_LINE_OCTETS:
+        return line + CRLF
+    pieces, piece, size = [], [], 0
+    for char in line:
+        octets = len(char.encode())
+        # continuation lines start with a space, which counts towards the limit
+        limit = MAX_LINE_OCTETS if not pieces else MAX_LINE_OCTETS - 1
+        if size + octets > limit:
+            pieces.append("".join(piece))
+            piece, size = [], 0
+        piece.append(char)
+        size += octets
+    pieces.append("".join(piece))
+    return (CRLF + " ").join(pieces) + CRLF
+
+
+def format_datetime(value: datetime) -> str:
+    # times are stored naive in UTC
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+
+def calendar_begin(name: Optional[str] = None) -> str:
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{PRODID}", "CALSCALE:GREGORIAN"]
+    if name:
+        lines.append(f"X-WR-CALNAME:{escape_text(name)}")
+    return "".join(fold_line(line) for line in lines)
+
+
+def calendar_end() -> str:
+    return fold_line("END:VCALENDAR")
+
+
+def _vevent(
+    uid: str,
+    dtstamp: str,
+    title: str,
+    description: Optional[str],
+    location: Optional[str],
+    start_time: datetime,
+    end_time: datetime,
+    extra: Iterable[str] = (),
+) -> Iterator[str]:
+    yield "BEGIN:VEVENT"
+    yield f"UID:{uid}"
+    yield f"DTSTAMP:{dtstamp}"
+    yield from extra
+    yield f"DTSTART:{format_datetime(start_time)}"
+    yield f"DTEND:{format_datetime(end_time)}"
+    yield f"SUMMARY:{escape_text(title)}"
+    if description:
+        yield f"DESCRIPTION:{escape_text(description)}"
+    if location:
+        yield f"LOCATION:{escape_text(location)}"
+    yield "END:VEVENT"
+
+
+def event_lines(
+    uid: str,
+    title: str,
+    description: Optional[str],
+    location: Optional[str],
+    start_time: datetime,
+    end_time: datetime,
+    rrule: Optional[str] = None,
+    exceptions=(),
+    dtstamp: Optional[str] = None,
+) -> Iterator[str]:
+    """Unfolded content lines of an event, with one VEVENT per moved occurrence."""
+    dtstamp = dtstamp or format_datetime(datetime.utcnow())
+    recurrence = []
+    overrides = []
+    if rrule:
+        recurrence.append(f"RRULE:{rrule}")
+        for exception in exceptions:
+            if exception.cancelled:
+                recurrence.append(f"EXDATE:{format_datetime(exception.original_start)}")
+            else:
+                overrides.append(exception)
+    yield from _vevent(
+        uid, dtstamp, title, description, location, start_time, end_time, recurrence
+    )
+    for exception in overrides:
+        # a moved occurrence is its own VEVENT sharing the series UID
+        yield from _vevent(
+            uid,
+            dtstamp,
+            title,
+            description,
+            location,
+            exception.start_time,
+            exception.end_time,
+            [f"RECURRENCE-ID:{format_datetime(exception.original_start)}"],
+        )
+
+
+def render_event(event, dtstamp: Optional[str] = None) -> str:
+    """Folded VEVENTs for an Event row with its exceptions loaded."""
+    lines = event_lines(
+        event.id,
+        event.title,
+        event.description,
+        event.location,
+        event.start_time,
+        event.end_time,
+        rrule=event.rrule,
+        exceptions=event.exceptions,
+        dtstamp=dtstamp,
+    )
+    return "".join(fold_line(line) for line in lines)
+
 
 def generate_ics(
     event_title: str,
@@ -9,27 +141,24 @@ def generate_ics(
     start_time: datetime,
     end_time: datetime,
     uid: str = None,
+    rrule: str = None,
+    exceptions=(),
 ) -> str:
     if uid is None:
         uid = str(uuid.uuid4())
 
-    dtstamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-    dtstart = start_time.strftime("%Y%m%dT%H%M%SZ")
-    dtend = end_time.strftime("%Y%m%dT%H%M%SZ")
-
-    ics_content = (
-        "BEGIN:VCALENDAR\n"
-        "VERSION:2.0\n"
-        "PRODID:-//PAW CONNEct//Paw Connect//EN\n"
-        "BEGIN:VEVENT\n"
-        f"UID:{uid}\n"
-        f"DTSTAMP:{dtstamp}\n"
-        f"DTSTART:{dtstart}\n"
-        f"DTEND:{dtend}\n"
-        f"SUMMARY:{event_title}\n"
-        f"DESCRIPTION:{event_description}\n"
-        f"LOCATION:{event_location}\n"
-        "END:VEVENT\n"
-        "END:VCALENDAR\n"
+    lines = event_lines(
+        uid,
+        event_title,
+        event_description,
+        event_location,
+        start_time,
+        end_time,
+        rrule=rrule,
+        exceptions=exceptions,
+    )
+    return (
+        calendar_begin()
+        + "".join(fold_line(line) for line in lines)
+        + calendar_end()
     )
-    return ics_content
@@ -0,0 +1,71 @@
+"""Media variant rendering, run in worker processes.
+
+Kept free of app imports so spawned workers start quickly. ffmpeg is optional:
+without it videos simply get no variants.
+"""
+import os
+import shutil
+import subprocess
+from typing import Dict, Iterable, Optional
+
+from PIL import Image, ImageOps
+
+VARIANT_FORMAT = "JPEG"
+VARIANT_EXTENSION = "jpg"
+VARIANT_QUALITY = 80
+FFMPEG_TIMEOUT = 60
+
+
+def ffmpeg_available() -> bool:
+    return shutil.which("ffmpeg") is not None
+
+
+def _resize_image(source: str, sizes: Iterable[int], out_dir: str) -> Dict[str, str]:
+    variants = {}
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        for size in sorted(sizes, reverse=True):
+            # never upscale; a variant as large as the original is pointless
+            if max(image.size) <= size:
+                continue
+            # resizing from the previous, larger variant keeps each step cheap
+            image.thumbnail((size, size), Image.LANCZOS)
+            path = os.path.join(out_dir, f"{size}.{VARIANT_EXTENSION}")
+            image.save(path, VARIANT_FORMAT, quality=VARIANT_QUALITY, optimize=True)
+            variants[str(size)] = path
+    return variants
+
+
+def _video_poster(source: str, out_dir: str) -> Optional[str]:
+    path = os.path.join(out_dir, f"poster.{VARIANT_EXTENSION}")
+    completed = subprocess.run(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-y", "-i", source]
+        + ["-frames:v", "1", path],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        timeout=FFMPEG_TIMEOUT,
+    )
+    if completed.returncode != 0 or not os.path.exists(path):
+        return None
+    return path
+
+
+def render_variants(
+    source: str, kind: str, sizes: Iterable[int], out_dir: str
+) -> Dict[str, str]:
+    """Render variants of `source` into `out_dir`, returning name -> local path.
+
+    `kind` is "image" or "video". Videos get a first-frame "poster", which is
+    then resized like an image.
+    """
+    variants = {}
+    if kind == "video":
+        if not ffmpeg_available():
+            return variants
+        poster = _video_poster(source, out_dir)
+        if poster is None:
+            return variants
+        variants["poster"] = poster
+        source = poster
+    variants.update(_resize_image(source, sizes, out_dir))
+    return variants
@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import os
+import time
+import zlib
+
+from elasticsearch.helpers import async_bulk
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import delete, func, update
+from sqlalchemy.future import select
+
+from app.db import SessionLocal
+from app.models import Channel, SearchOutbox
+from app.outbox import DELETE_CHANNEL, INDEX
+from app.search import MAPPINGS
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "500"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+OUTBOX_BULK_RETRIES = int(os.getenv("OUTBOX_BULK_RETRIES", "3"))
+# drainers share an advisory lock per index under this key; a reindex takes
+# the one of the index it rebuilds exclusively, to pause writes to it alone
+OUTBOX_LOCK_KEY = 0x5EA4C4
+
+logger = logging.getLogger(__name__)
+
+outbox_lag_seconds = Gauge(
+    "search_outbox_lag_seconds", "Age of the oldest outbox entry in the last batch"
+)
+outbox_documents = Counter(
+    "search_outbox_documents_total", "Outbox entries processed", ["operation", "result"]
+)
+outbox_batch_seconds = Histogram(
+    "search_outbox_batch_seconds", "Time to drain one outbox batch into Elasticsearch"
+)
+
+
+def index_lock_key(index: str) -> int:
+    # the same in every process, unlike hash()
+    return zlib.crc32(index.encode()) & 0x7FFFFFFF
+
+
+def _action(entry):
+    action = {
+        "_op_type": "delete",
+        "_index": entry.index,
+        "_id": entry.document_id,
+        # outbox ids follow commit order per document, so with several
+        # drainers an older entry landing late is rejected instead of winning
+        "version": entry.id,
+        "version_type": "external",
+    }
+    if entry.operation == INDEX:
+        action.update(_op_type="index", _source=entry.document)
+    return action
+
+
+async def _delete_channels(es, cleanups) -> set:
+    """Drop the documents of each channel; returns the document ids to retry."""
+    failed_ids = set()
+    try:
+        # delete_by_query only sees refreshed documents, like the ones just written
+        await es.indices.refresh(index=",".join(MAPPINGS))
+    except Exception:
+        logger.warning("Search refresh before channel cleanup failed", exc_info=True)
+        return {doc_id for doc_ids in cleanups.values() for doc_id in doc_ids}
+    for channel_id, doc_ids in cleanups.items():
+        try:
+            await es.delete_by_query(
+                index=",".join(MAPPINGS),
+                query={"term": {"channel_id": channel_id}},
+                conflicts="proceed",
+            )
+        except Exception:
+            logger.warning("Search channel cleanup failed", exc_info=True)
+            failed_ids.update(doc_ids)
+    return failed_ids
+
+
+async def drain_outbox(es, batch_size: int = OUTBOX_BATCH_SIZE) -> int:
+    """Push one batch of outbox entries to Elasticsearch; returns the batch size."""
+    async with SessionLocal() as db:
+        result = await db.execute(
+            select(
+                *(
+                    func.pg_try_advisory_xact_lock_shared(
+                        OUTBOX_LOCK_KEY, index_lock_key(index)
+                    )
+                    for index in MAPPINGS
+                )
+            )
+        )
+        paused = [index for index, locked in zip(MAPPINGS, result.one()) if not locked]
+        age = func.extract("epoch", func.now() - SearchOutbox.created_at)
+        query = select(SearchOutbox, age).where(
+            SearchOutbox.attempts < OUTBOX_MAX_ATTEMPTS
+        )
+        if paused:
+            # being reindexed: the new index gets these entries after the swap;
+            # channel deletes touch every index, so they wait as well
+            query = query.where(
+                SearchOutbox.index.not_in(paused),
+                SearchOutbox.operation != DELETE_CHANNEL,
+            )
+        result = await db.execute(
+            query.order_by(SearchOutbox.id)
+            .limit(batch_size)
+            # lets several workers drain the outbox side by side
+            .with_for_update(skip_locked=True)
+        )
+        rows = result.all()
+        if not rows:
+            outbox_lag_seconds.set(0)
+            return 0
+        outbox_lag_seconds.set(float(rows[0][1]))
+        entries = [entry for entry, _ in rows]
+
+        started = time.perf_counter()
+        # only the newest write of a document matters; ids keep it idempotent
+        latest = {}
+        channel_deletes = []
+        for entry in entries:
+            if entry.operation == DELETE_CHANNEL:
+                channel_deletes.append(entry)
+            else:
+                latest[(entry.index, entry.document_id)] = entry
+
+        # channel id -> ids of its documents written by this batch
+        indexed_channels = {}
+        for entry in latest.values():
+            if entry.operation == INDEX:
+                indexed_channels.setdefault(entry.document["channel_id"], []).append(
+                    entry.document_id
+                )
+
+        failed_ids = set()
+        if latest:
+            _, errors = await async_bulk(
+                es,
+                [_action(entry) for entry in latest.values()],
+                max_retries=OUTBOX_BULK_RETRIES,
+                raise_on_error=False,
+                raise_on_exception=False,
+            )
+            for error in errors:
+                op_type, item = next(iter(error.items()))
+                if op_type == "delete" and item.get("status") == 404:
+                    continue
+                if item.get("status") == 409:
+                    # a newer entry for the document was already applied
+                    continue
+                failed_ids.add(item.get("_id"))
+                logger.warning("Search indexing failed: %s", item.get("error"))
+
+        cleanups = {entry.document_id: [entry.document_id] for entry in channel_deletes}
+        if indexed_channels:
+            result = await db.execute(
+                select(Channel.id).where(Channel.id.in_(indexed_channels))
+            )
+            # a channel deleted meanwhile may have had its cleanup run before
+            # these documents landed, e.g. by a drainer with newer entries
+            for channel_id in indexed_channels.keys() - set(result.scalars()):
+                cleanups.setdefault(channel_id, []).extend(indexed_channels[channel_id])
+        if cleanups:
+            failed_ids.update(await _delete_channels(es, cleanups))
+
+        done, failed = [], []
+        for entry in entries:
+            if entry.document_id in failed_ids:
+                failed.append(entry.id)
+                outbox_documents.labels(entry.operation, "failed").inc()
+            else:
+                done.append(entry.id)
+                outbox_documents.labels(entry.operation, "ok").inc()
+        if done:
+            await db.execute(delete(SearchOutbox).where(SearchOutbox.id.in_(done)))
+        if failed:
+            await db.execute(
+                update(SearchOutbox)
+                .where(SearchOutbox.id.in_(failed))
+                .values(attempts=SearchOutbox.attempts + 1)
+            )
+        await db.commit()
+        outbox_batch_seconds.observe(time.perf_counter() - started)
+        return len(entries)
+
+
+async def run_indexer(es, poll_interval: float = OUTBOX_POLL_INTERVAL):
+    while True:
+        try:
+            drained = await drain_outbox(es)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning("Search outbox drain failed", exc_info=True)
+            drained = 0
+        if drained < OUTBOX_BATCH_SIZE:
+            await asyncio.sleep(poll_interval)
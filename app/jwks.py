@@ -0,0 +1,125 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Optional
+
+import httpx
+from jose import jwk
+
+from app.token_cache import token_cache
+
+# e.g. http://keycloak:8080/realms/paw_connect/protocol/openid-connect/certs
+KEYCLOAK_JWKS_URL = os.getenv("KEYCLOAK_JWKS_URL", "")
+# a local JWKS document takes precedence over the URL (offline runs, tests)
+KEYCLOAK_JWKS_PATH = os.getenv("KEYCLOAK_JWKS_PATH", "")
+KEYCLOAK_JWKS_REFRESH_INTERVAL = int(os.getenv("KEYCLOAK_JWKS_REFRESH_INTERVAL", "300"))
+# an unknown kid triggers at most one refresh per this many seconds
+KEYCLOAK_JWKS_MIN_REFRESH_INTERVAL = int(
+    os.getenv("KEYCLOAK_JWKS_MIN_REFRESH_INTERVAL", "30")
+)
+
+logger = logging.getLogger(__name__)
+
+
+class KeyStore:
+    """Signing keys indexed by `kid`, swapped atomically on every refresh."""
+
+    def __init__(self):
+        self._keys: dict = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def get(self, kid: Optional[str]):
+        if kid is None:
+            return None
+        return self._keys.get(kid)
+
+    def load(self, document: dict):
+        keys = {}
+        for key_data in document.get("keys", []):
+            kid = key_data.get("kid")
+            if not kid or key_data.get("use", "sig") != "sig":
+                continue
+            try:
+                keys[kid] = jwk.construct(key_data, key_data.get("alg", "RS256"))
+            except Exception:
+                logger.warning("Skipping unusable JWKS key %s", kid, exc_info=True)
+        if set(self._keys) - set(keys):
+            # claims verified with a retired key must be checked again
+            token_cache.clear()
+        self._keys = keys
+
+
+key_store = KeyStore()
+_refresh_lock = asyncio.Lock()
+_refresh_attempted_at: Optional[float] = None
+
+
+def jwks_configured() -> bool:
+    return bool(KEYCLOAK_JWKS_PATH or KEYCLOAK_JWKS_URL)
+
+
+def _read_jwks_file(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+async def fetch_jwks() -> dict:
+    if KEYCLOAK_JWKS_PATH:
+        return await asyncio.to_thread(_read_jwks_file, KEYCLOAK_JWKS_PATH)
+    async with httpx.AsyncClient(timeout=10) as client:
+        response = await client.get(KEYCLOAK_JWKS_URL)
+        response.raise_for_status()
+        return response.json()
+
+
+async def refresh_jwks(store: KeyStore = key_store):
+    global _refresh_attempted_at
+    _refresh_attempted_at = time.monotonic()
+    store.load(await fetch_jwks())
+    logger.info("Loaded %d JWKS signing keys", len(store))
+
+
+async def get_signing_key(kid: Optional[str], store: KeyStore = key_store):
+    """The key for `kid`, refreshing the JWKS first if it is not known yet.
+
+    Keycloak signs with a new key as soon as it rotates, before the periodic
+    refresh picks it up. Refreshes on unknown kids are rate limited, so tokens
+    with made-up kids cannot hammer the JWKS endpoint.
+    """
+    key = store.get(kid)
+    if key is not None or kid is None:
+        return key
+    async with _refresh_lock:
+        # a concurrent request may have refreshed while this one waited
+        key = store.get(kid)
+        if key is not None:
+            return key
+        if (
+            _refresh_attempted_at is not None
+            and time.monotonic() - _refresh_attempted_at
+            < KEYCLOAK_JWKS_MIN_REFRESH_INTERVAL
+        ):
+            return None
+        try:
+            await refresh_jwks(store)
+        except Exception:
+            logger.warning("JWKS refresh for unknown kid %s failed", kid, exc_info=True)
+        return store.get(kid)
+
+
+async def run_jwks_refresher(
+    store: KeyStore = key_store, interval: int = KEYCLOAK_JWKS_REFRESH_INTERVAL
+):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await refresh_jwks(store)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # keep serving with the previous key set until the next attempt
+            logger.warning("JWKS refresh failed", exc_info=True)
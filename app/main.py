@@ -1,29 +1,55 @@
 import asyncio
+import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.minio import init_minio_bucket
 from app import routers
 from app import metrics
-from elasticsearch import AsyncElasticsearch
+from app.jwks import jwks_configured, refresh_jwks, run_jwks_refresher
+from app.broadcast import get_broadcast
+from app.elastic import es
+from app.indexer import run_indexer
+from app.media_store import run_media_gc
+from app.search import ensure_indices
+from app.thumbnails import shutdown_thumbnail_pool
+
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     if not await wait_for_elasticsearch(es):
         raise Exception("Elasticsearch is not available after waiting")
+    await ensure_indices(es)
 
     init_minio_bucket()
 
+    broadcast = get_broadcast()
+    await broadcast.start()
+    background_tasks = [
+        asyncio.create_task(run_indexer(es)),
+        asyncio.create_task(run_media_gc()),
+    ]
+    if jwks_configured():
+        try:
+            await refresh_jwks()
+        except Exception:
+            logger.warning("Initial JWKS load failed", exc_info=True)
+        background_tasks.append(asyncio.create_task(run_jwks_refresher()))
+
     yield
 
+    for task in background_tasks:
+        task.cancel()
+    await broadcast.stop()
+    shutdown_thumbnail_pool()
+
 
 app = FastAPI(title="Blog", lifespan=lifespan)
 
 app.include_router(routers.router)
 app.include_router(metrics.router)
 
-es = AsyncElasticsearch(hosts=["http://elasticsearch:9200"])
-
 
 async def wait_for_elasticsearch(es_client, timeout: int = 60):
     for i in range(timeout):
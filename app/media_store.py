@@ -0,0 +1,186 @@
+"""Content-addressed media storage.
+
+Uploads are stored under the SHA-256 of their bytes, once. `media_objects`
+counts the Media rows referencing each object; triggers on media keep the count,
+whichever way the rows go. An object is removed with its last reference, right
+away by delete_media and by the GC loop after cascading deletes. The same loop
+removes presigned uploads that were never confirmed.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+from datetime import datetime
+from typing import BinaryIO, Optional, Tuple
+
+from prometheus_client import Counter
+from sqlalchemy import Boolean, delete, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.db import SessionLocal
+from app.minio import remove_object, remove_prefix, upload_fileobj
+from app.models import MediaObject, PendingUpload
+from app.thumbnails import variant_prefix
+
+HASH_CHUNK_SIZE = 1024 * 1024
+MEDIA_GC_INTERVAL = float(os.getenv("MEDIA_GC_INTERVAL", "60"))
+MEDIA_GC_BATCH_SIZE = int(os.getenv("MEDIA_GC_BATCH_SIZE", "100"))
+# how long after its URL expires an unconfirmed upload is kept; an upload
+# started just before expiry may still be in flight
+PENDING_UPLOAD_GRACE = int(os.getenv("PENDING_UPLOAD_GRACE", "3600"))
+
+logger = logging.getLogger(__name__)
+
+media_dedup_hits = Counter(
+    "media_dedup_hits_total", "Uploads whose content was already stored"
+)
+media_dedup_misses = Counter("media_dedup_misses_total", "Uploads stored as new objects")
+media_objects_collected = Counter(
+    "media_objects_collected_total", "Unreferenced objects removed by the media GC"
+)
+pending_uploads_collected = Counter(
+    "pending_uploads_collected_total", "Unconfirmed uploads removed by the media GC"
+)
+
+
+def content_key(digest: str) -> str:
+    return f"sha256/{digest}"
+
+
+def hash_fileobj(fileobj: BinaryIO) -> Tuple[str, int]:
+    fileobj.seek(0)
+    digest = hashlib.sha256()
+    size = 0
+    while chunk := fileobj.read(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+        size += len(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest(), size
+
+
+async def store_fileobj(
+    db: AsyncSession, fileobj: BinaryIO, content_type: Optional[str] = None
+) -> str:
+    """Reference the object holding these bytes, uploading it only if it is new.
+
+    Runs in the caller's transaction, which then inserts the Media row that
+    counts as the reference. The upsert's row lock makes concurrent uploads of
+    the same content wait for the first, and keeps the GC off the object until
+    the reference is committed.
+    """
+    digest, size = await asyncio.to_thread(hash_fileobj, fileobj)
+    key = content_key(digest)
+    result = await db.execute(
+        pg_insert(MediaObject)
+        .values(key=key, sha256=digest, size=size, content_type=content_type)
+        .on_conflict_do_update(
+            index_elements=[MediaObject.key],
+            # a no-op update, for the row lock and the RETURNING row
+            set_={"ref_count": MediaObject.ref_count},
+        )
+        # xmax is 0 only for a freshly inserted row
+        .returning(literal_column("xmax = 0", Boolean))
+    )
+    if result.scalar():
+        media_dedup_misses.inc()
+        await upload_fileobj(key, fileobj, length=size, content_type=content_type)
+    else:
+        media_dedup_hits.inc()
+    return key
+
+
+async def register_object(db: AsyncSession, key: str) -> bool:
+    """Add the row for an object uploaded by the client; False if it has one already.
+
+    Its Media row then counts as a reference like any other. Registering
+    before the object is checked keeps the GC from removing it in between.
+    """
+    result = await db.execute(
+        pg_insert(MediaObject)
+        .values(key=key)
+        .on_conflict_do_nothing(index_elements=[MediaObject.key])
+        .returning(MediaObject.key)
+    )
+    return result.scalar() is not None
+
+
+async def _remove_stored(key: str):
+    await remove_object(key)
+    await remove_prefix(variant_prefix(key))
+
+
+async def release_object(db: AsyncSession, key: str):
+    """Remove the object and its variants if no Media row references it any more.
+
+    Call once the deleted Media row is flushed, so the count is up to date.
+    The removal happens under the row lock, before the caller commits, so a
+    concurrent upload of the same content waits and then stores it anew.
+    """
+    result = await db.execute(
+        select(MediaObject).where(MediaObject.key == key).with_for_update()
+    )
+    media_object = result.scalars().first()
+    if media_object is not None:
+        if media_object.ref_count > 0:
+            return
+        await db.delete(media_object)
+        await db.flush()
+    await _remove_stored(key)
+
+
+async def collect_unreferenced(batch_size: int = MEDIA_GC_BATCH_SIZE) -> int:
+    """Remove a batch of objects no Media row references; returns how many."""
+    async with SessionLocal() as db:
+        result = await db.execute(
+            select(MediaObject.key)
+            .where(MediaObject.ref_count <= 0)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        keys = result.scalars().all()
+        for key in keys:
+            await _remove_stored(key)
+        if keys:
+            await db.execute(delete(MediaObject).where(MediaObject.key.in_(keys)))
+        await db.commit()
+    media_objects_collected.inc(len(keys))
+    return len(keys)
+
+
+async def collect_expired_uploads(batch_size: int = MEDIA_GC_BATCH_SIZE) -> int:
+    """Remove a batch of presigned uploads never confirmed; returns how many."""
+    async with SessionLocal() as db:
+        result = await db.execute(
+            select(PendingUpload.object_name)
+            .where(PendingUpload.expires_at < datetime.utcnow())
+            .limit(batch_size)
+            # a confirm in progress holds its row
+            .with_for_update(skip_locked=True)
+        )
+        object_names = result.scalars().all()
+        for object_name in object_names:
+            await remove_object(object_name)
+        if object_names:
+            await db.execute(
+                delete(PendingUpload).where(PendingUpload.object_name.in_(object_names))
+            )
+        await db.commit()
+    pending_uploads_collected.inc(len(object_names))
+    return len(object_names)
+
+
+async def run_media_gc(interval: float = MEDIA_GC_INTERVAL):
+    while True:
+        try:
+            collected = max(
+                await collect_unreferenced(), await collect_expired_uploads()
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning("Media GC failed", exc_info=True)
+            collected = 0
+        if collected < MEDIA_GC_BATCH_SIZE:
+            await asyncio.sleep(interval)
@@ -1,10 +1,25 @@
+import asyncio
+import functools
 import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import BinaryIO, Optional
 from minio import Minio
 
 MINIO_ENDPOINT = os.getenv("MINIO_HOST", "minio:9000")
 MINIO_ACCESS_KEY = os.getenv("MINIO_ACCESS_KEY", "minio_access_key")
 MINIO_SECRET_KEY = os.getenv("MINIO_SECRET_KEY", "minio_secret_key")
 MINIO_BUCKET = os.getenv("MINIO_BUCKET", "channels-media")
+# memory held per upload; S3 multipart needs at least 5 MiB per part
+MINIO_PART_SIZE = max(
+    int(os.getenv("MINIO_PART_SIZE", str(10 * 1024 * 1024))), 5 * 1024 * 1024
+)
+MINIO_UPLOAD_WORKERS = int(os.getenv("MINIO_UPLOAD_WORKERS", "4"))
+# host clients use to reach MinIO directly with presigned URLs
+MINIO_PUBLIC_ENDPOINT = os.getenv("MINIO_PUBLIC_HOST", MINIO_ENDPOINT)
+MINIO_PUBLIC_SECURE = os.getenv("MINIO_PUBLIC_SECURE", "false").lower() == "true"
+MINIO_REGION = os.getenv("MINIO_REGION", "us-east-1")
+MINIO_PRESIGN_EXPIRY = int(os.getenv("MINIO_PRESIGN_EXPIRY", "900"))
 
 minio_client = Minio(
     MINIO_ENDPOINT,
@@ -13,12 +28,111 @@ minio_client = Minio(
     secure=False,
 )
 
+# with the region fixed, signing is purely local and never calls the server
+presign_client = Minio(
+    MINIO_PUBLIC_ENDPOINT,
+    access_key=MINIO_ACCESS_KEY,
+    secret_key=MINIO_SECRET_KEY,
+    secure=MINIO_PUBLIC_SECURE,
+    region=MINIO_REGION,
+)
+
+# the minio client is blocking, so every call goes through this bounded pool
+storage_executor = ThreadPoolExecutor(
+    max_workers=MINIO_UPLOAD_WORKERS, thread_name_prefix="minio"
+)
+
 
 def get_minio_client():
     return minio_client
 
 
+def get_presign_client():
+    return presign_client
+
+
 def init_minio_bucket():
     if not minio_client.bucket_exists(MINIO_BUCKET):
         minio_client.make_bucket(MINIO_BUCKET)
         # przestawić na publiczny
+
+
+async def run_storage(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        storage_executor, functools.partial(func, *args, **kwargs)
+    )
+
+
+def _put_fileobj(
+    object_name: str, fileobj: BinaryIO, length: int, content_type: Optional[str]
+):
+    fileobj.seek(0)
+    # one part in flight at a time keeps memory at MINIO_PART_SIZE per upload
+    return minio_client.put_object(
+        MINIO_BUCKET,
+        object_name,
+        data=fileobj,
+        length=length,
+        content_type=content_type or "application/octet-stream",
+        part_size=MINIO_PART_SIZE,
+        num_parallel_uploads=1,
+    )
+
+
+async def upload_fileobj(
+    object_name: str,
+    fileobj: BinaryIO,
+    length: Optional[int] = None,
+    content_type: Optional[str] = None,
+):
+    """Stream a file object to the media bucket in multipart chunks."""
+    if length is None:
+        length = -1
+    return await run_storage(_put_fileobj, object_name, fileobj, length, content_type)
+
+
+async def download_file(object_name: str, path: str):
+    return await run_storage(minio_client.fget_object, MINIO_BUCKET, object_name, path)
+
+
+async def upload_file(object_name: str, path: str, content_type: Optional[str] = None):
+    return await run_storage(
+        minio_client.fput_object,
+        MINIO_BUCKET,
+        object_name,
+        path,
+        content_type=content_type or "application/octet-stream",
+        part_size=MINIO_PART_SIZE,
+    )
+
+
+async def remove_object(object_name: str):
+    return await run_storage(minio_client.remove_object, MINIO_BUCKET, object_name)
+
+
+def _remove_prefix(prefix: str):
+    for item in minio_client.list_objects(MINIO_BUCKET, prefix=prefix, recursive=True):
+        minio_client.remove_object(MINIO_BUCKET, item.object_name)
+
+
+async def remove_prefix(prefix: str):
+    return await run_storage(_remove_prefix, prefix)
+
+
+async def stat_object(object_name: str):
+    return await run_storage(minio_client.stat_object, MINIO_BUCKET, object_name)
+
+
+def presigned_upload_url(object_name: str, expires: int = MINIO_PRESIGN_EXPIRY) -> str:
+    return get_presign_client().presigned_put_object(
+        MINIO_BUCKET, object_name, expires=timedelta(seconds=expires)
+    )
+
+
+def presigned_download_url(
+    object_name: str, expires: int = MINIO_PRESIGN_EXPIRY
+) -> str:
+    return get_presign_client().presigned_get_object(
+        MINIO_BUCKET, object_name, expires=timedelta(seconds=expires)
+    )
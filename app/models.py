@@ -1,4 +1,19 @@
-from sqlalchemy import Column, DateTime, ForeignKey, String, Text, func
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Boolean,
+    Column,
+    Computed,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+    func,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, TSRANGE
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -10,70 +25,240 @@ class Channel(Base):
     id = Column(String, primary_key=True, index=True, default=func.uuid_generate_v4())
     name = Column(String, nullable=False)
     description = Column(String, nullable=True)
-    client_id = Column(String, nullable=False)
-    behaviorist_id = Column(String, nullable=False)
+    client_id = Column(String, nullable=False, index=True)
+    behaviorist_id = Column(String, nullable=False, index=True)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
+    # bumped by triggers on posts, comments, media and events
+    version = Column(Integer, nullable=False, server_default="0")
+    last_activity_at = Column(DateTime, nullable=True)
 
-    posts = relationship("Post", back_populates="channel", cascade="all, delete-orphan")
+    posts = relationship(
+        "Post",
+        back_populates="channel",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
     events = relationship(
-        "Event", back_populates="channel", cascade="all, delete-orphan"
+        "Event",
+        back_populates="channel",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
 
 class Post(Base):
     __tablename__ = "posts"
+    __table_args__ = (
+        Index("ix_posts_channel_id_created_at", "channel_id", "created_at"),
+        Index("ix_posts_channel_id_channel_version", "channel_id", "channel_version"),
+    )
     id = Column(String, primary_key=True, index=True, default=func.uuid_generate_v4())
     title = Column(String, index=True)
     content = Column(Text)
-    channel_id = Column(String, ForeignKey("channels.id"))
+    channel_id = Column(String, ForeignKey("channels.id", ondelete="CASCADE"))
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
     author_id = Column(String, nullable=False)
+    # the channel version this row's last write produced, stamped by a
+    # trigger; delta sync selects rows above the client's version
+    channel_version = Column(Integer, nullable=False, server_default="0")
 
     channel = relationship("Channel", back_populates="posts")
     comments = relationship(
-        "Comment", back_populates="post", cascade="all, delete-orphan"
+        "Comment",
+        back_populates="post",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
     media = relationship(
-        "Media", back_populates="post", cascade="all, delete-orphan"
+        "Media",
+        back_populates="post",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
 
 
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        Index("ix_comments_post_id_created_at", "post_id", "created_at"),
+        Index("ix_comments_post_id_channel_version", "post_id", "channel_version"),
+    )
     id = Column(String, primary_key=True, index=True, default=func.uuid_generate_v4())
     content = Column(Text)
-    post_id = Column(String, ForeignKey("posts.id"))
+    post_id = Column(String, ForeignKey("posts.id", ondelete="CASCADE"))
     author_id = Column(String, nullable=False)
     created_at = Column(DateTime, server_default=func.now())
+    # see Post.channel_version
+    channel_version = Column(Integer, nullable=False, server_default="0")
 
     post = relationship("Post", back_populates="comments")
 
 
 class Media(Base):
     __tablename__ = "media"
+    __table_args__ = (
+        Index("ix_media_post_id_channel_version", "post_id", "channel_version"),
+    )
     id = Column(String, primary_key=True, index=True, default=func.uuid_generate_v4())
-    post_id = Column(String, ForeignKey("posts.id"), nullable=True)
-    file_path = Column(String, nullable=False)
+    post_id = Column(
+        String, ForeignKey("posts.id", ondelete="CASCADE"), nullable=True, index=True
+    )
+    file_path = Column(String, nullable=False, index=True)
+    # variant name (e.g. "320", "poster") -> object key, filled in after upload
+    variants = Column(JSON, nullable=True)
     created_at = Column(DateTime, server_default=func.now())
     created_by = Column(String, nullable=False)
+    # see Post.channel_version
+    channel_version = Column(Integer, nullable=False, server_default="0")
 
     post = relationship("Post", back_populates="media")
 
 
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        Index("ix_events_channel_id_start_time", "channel_id", "start_time"),
+        Index("ix_events_channel_id_channel_version", "channel_id", "channel_version"),
+        Index(
+            "ix_events_channel_id_during",
+            "channel_id",
+            "during",
+            postgresql_using="gist",
+        ),
+    )
     id = Column(String, primary_key=True, index=True, default=func.uuid_generate_v4())
-    channel_id = Column(String, ForeignKey("channels.id"), nullable=False)
+    channel_id = Column(
+        String, ForeignKey("channels.id", ondelete="CASCADE"), nullable=False
+    )
     title = Column(String, nullable=False)
     description = Column(Text, nullable=True)
     location = Column(String, nullable=True)
     start_time = Column(DateTime, nullable=False)
     end_time = Column(DateTime, nullable=False)
+    # RFC 5545 RRULE value; start_time/end_time describe the first occurrence
+    rrule = Column(String, nullable=True)
+    # end of the last occurrence, NULL for open-ended series
+    recurrence_end = Column(DateTime, nullable=True)
+    # earliest start and latest end of moved occurrences, which may fall
+    # outside the series
+    moved_start = Column(DateTime, nullable=True)
+    moved_end = Column(DateTime, nullable=True)
+    # time covered by the event, or by the whole series for recurring ones;
+    # closed, so zero-length events still overlap the windows around them
+    during = Column(
+        TSRANGE,
+        Computed(
+            "tsrange(least(start_time, moved_start), CASE"
+            " WHEN rrule IS NULL THEN greatest(end_time, start_time)"
+            " WHEN recurrence_end IS NULL THEN NULL"
+            " ELSE greatest(recurrence_end, moved_end, start_time) END, '[]')",
+            persisted=True,
+        ),
+    )
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
     created_by = Column(String, nullable=False)
+    # see Post.channel_version
+    channel_version = Column(Integer, nullable=False, server_default="0")
 
     channel = relationship("Channel", back_populates="events")
+    exceptions = relationship(
+        "EventException",
+        back_populates="event",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+
+class EventException(Base):
+    """A moved or cancelled occurrence of a recurring event."""
+
+    __tablename__ = "event_exceptions"
+    __table_args__ = (
+        UniqueConstraint("event_id", "original_start"),
+    )
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    event_id = Column(
+        String, ForeignKey("events.id", ondelete="CASCADE"), nullable=False
+    )
+    original_start = Column(DateTime, nullable=False)
+    cancelled = Column(Boolean, nullable=False, server_default="false")
+    start_time = Column(DateTime, nullable=True)
+    end_time = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+
+    event = relationship("Event", back_populates="exceptions")
+
+
+class MediaObject(Base):
+    """A stored object, keyed by content, shared by every Media row that uses it."""
+
+    __tablename__ = "media_objects"
+    key = Column(String, primary_key=True)
+    # unknown for objects stored before deduplication
+    sha256 = Column(String, nullable=True)
+    size = Column(BigInteger, nullable=True)
+    content_type = Column(String, nullable=True)
+    # kept by triggers on media; objects at zero are removed by the media GC
+    ref_count = Column(Integer, nullable=False, server_default="0")
+    created_at = Column(DateTime, server_default=func.now())
+
+
+class PendingUpload(Base):
+    """A presigned upload not confirmed yet; the media GC removes it once expired."""
+
+    __tablename__ = "pending_uploads"
+    object_name = Column(String, primary_key=True)
+    post_id = Column(String, nullable=False)
+    created_by = Column(String, nullable=False)
+    # declared by the client; the uploaded object must match it
+    size = Column(BigInteger, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class SearchOutbox(Base):
+    """Pending Elasticsearch writes, committed together with the source rows."""
+
+    __tablename__ = "search_outbox"
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    index = Column(String, nullable=False)
+    document_id = Column(String, nullable=False)
+    operation = Column(String, nullable=False)
+    document = Column(JSON, nullable=True)
+    attempts = Column(Integer, nullable=False, server_default="0")
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+
+class Tombstone(Base):
+    """Record of a hard delete, so delta sync can report it."""
+
+    __tablename__ = "tombstones"
+    __table_args__ = (
+        Index(
+            "ix_tombstones_channel_id_channel_version", "channel_id", "channel_version"
+        ),
+    )
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    # no foreign key: tombstones outlive the rows they describe
+    channel_id = Column(String, nullable=False)
+    entity_type = Column(String, nullable=False)
+    entity_id = Column(String, nullable=False)
+    # for a deleted channel, who may be told it is gone
+    member_ids = Column(ARRAY(String), nullable=True)
+    deleted_at = Column(DateTime, server_default=func.now(), nullable=False)
+    # the channel version the deletion produced
+    channel_version = Column(Integer, nullable=False, server_default="0")
+
+
+class FeedToken(Base):
+    """A revocable key for subscribing to a user's calendar feeds by URL."""
+
+    __tablename__ = "feed_tokens"
+    id = Column(String, primary_key=True, default=func.uuid_generate_v4())
+    user_id = Column(String, nullable=False, index=True)
+    # SHA-256 of the key; the key itself is only shown once, on creation
+    token_hash = Column(String, nullable=False, unique=True)
+    created_at = Column(DateTime, server_default=func.now())
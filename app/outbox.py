@@ -0,0 +1,48 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import SearchOutbox
+from app.search import (
+    COMMENTS_INDEX,
+    EVENTS_INDEX,
+    POSTS_INDEX,
+    comment_document,
+    event_document,
+    post_document,
+)
+
+INDEX = "index"
+DELETE = "delete"
+DELETE_CHANNEL = "delete_channel"
+
+
+def enqueue(db: AsyncSession, index: str, document_id: str, operation: str, document=None):
+    """Stage a search write; it is committed with the caller's transaction."""
+    db.add(
+        SearchOutbox(
+            index=index,
+            document_id=document_id,
+            operation=operation,
+            document=document,
+        )
+    )
+
+
+def enqueue_post(db: AsyncSession, post):
+    enqueue(db, POSTS_INDEX, post.id, INDEX, post_document(post))
+
+
+def enqueue_comment(db: AsyncSession, comment, channel_id: str):
+    enqueue(db, COMMENTS_INDEX, comment.id, INDEX, comment_document(comment, channel_id))
+
+
+def enqueue_event(db: AsyncSession, event):
+    enqueue(db, EVENTS_INDEX, event.id, INDEX, event_document(event))
+
+
+def enqueue_event_delete(db: AsyncSession, event_id: str):
+    enqueue(db, EVENTS_INDEX, event_id, DELETE)
+
+
+def enqueue_channel_delete(db: AsyncSession, channel_id: str):
+    # posts, comments and events of the channel are dropped in one delete_by_query
+    enqueue(db, "*", channel_id, DELETE_CHANNEL)
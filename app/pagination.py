@@ -0,0 +1,69 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Generic, List, Optional, TypeVar
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
+class PageParams:
+    def __init__(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    ):
+        self.cursor = cursor
+        self.limit = limit
+
+
+def encode_cursor(created_at: datetime, id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_order(model, descending: bool = False):
+    if descending:
+        return model.created_at.desc(), model.id.desc()
+    return model.created_at.asc(), model.id.asc()
+
+
+def keyset_filter(model, cursor: Optional[str], descending: bool = False) -> list:
+    """Criteria selecting rows after the cursor in keyset_order."""
+    if cursor is None:
+        return []
+    key = tuple_(model.created_at, model.id)
+    position = tuple_(*decode_cursor(cursor))
+    return [key < position] if descending else [key > position]
+
+
+def paginate(rows, limit: int) -> dict:
+    """Build a page from rows fetched with `limit + 1`."""
+    rows = list(rows)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return {"items": rows, "next_cursor": next_cursor}
@@ -0,0 +1,69 @@
+import asyncio
+import os
+from collections import defaultdict
+from typing import Dict, Set
+
+from prometheus_client import Counter, Gauge
+
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "100"))
+
+ws_subscribers = Gauge("ws_subscribers", "Open channel feed connections")
+ws_messages = Counter("ws_messages_total", "Messages queued to channel feed subscribers")
+ws_dropped = Counter("ws_dropped_total", "Subscribers dropped for falling behind")
+
+
+class Subscription:
+    def __init__(self, channel_id: str, queue_size: int):
+        self.channel_id = channel_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+
+class Hub:
+    """In-process fan-out of channel events to websocket subscribers.
+
+    Every subscriber has a bounded send queue; publishing never waits on a
+    socket, and a subscriber whose queue is full is dropped instead.
+    """
+
+    def __init__(self, queue_size: int = WS_SEND_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = defaultdict(set)
+
+    def subscribe(self, channel_id: str) -> Subscription:
+        subscription = Subscription(channel_id, self.queue_size)
+        self._subscribers[channel_id].add(subscription)
+        ws_subscribers.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.channel_id)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.channel_id]
+        ws_subscribers.dec()
+
+    def channel_ids(self):
+        return list(self._subscribers)
+
+    def publish(self, channel_id: str, message: dict) -> int:
+        delivered = 0
+        for subscription in list(self._subscribers.get(channel_id, ())):
+            try:
+                subscription.queue.put_nowait(message)
+                delivered += 1
+            except asyncio.QueueFull:
+                subscription.dropped = True
+                self.unsubscribe(subscription)
+                ws_dropped.inc()
+        ws_messages.inc(delivered)
+        return delivered
+
+
+hub = Hub()
+
+
+def get_hub():
+    return hub
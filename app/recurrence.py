@@ -0,0 +1,226 @@
+import heapq
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional, Tuple
+
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+RRULE_MAX_COUNT = int(os.getenv("RRULE_MAX_COUNT", "1000"))
+
+
+class RecurrenceRule:
+    """The subset of an RFC 5545 RRULE the app supports.
+
+    FREQ (DAILY, WEEKLY, MONTHLY, YEARLY), INTERVAL, COUNT or UNTIL, and BYDAY
+    with plain weekdays for weekly rules. Monthly and yearly rules repeat the
+    day of the first occurrence and skip periods where that date does not exist.
+    """
+
+    def __init__(
+        self,
+        freq: str,
+        interval: int = 1,
+        count: Optional[int] = None,
+        until: Optional[datetime] = None,
+        byday: Optional[List[int]] = None,
+    ):
+        self.freq = freq
+        self.interval = interval
+        self.count = count
+        self.until = until
+        self.byday = byday
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """`value` as the naive UTC the database stores; aware inputs are converted."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _parse_until(value: str) -> datetime:
+    # times are stored naive and treated as UTC, like the ICS export does
+    value = value.removesuffix("Z")
+    for fmt in ("%Y%m%dT%H%M%S", "%Y%m%d"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    raise ValueError(f"Invalid UNTIL: {value}")
+
+
+def parse_rrule(value: str) -> RecurrenceRule:
+    """Parse an RRULE value, raising ValueError for anything unsupported."""
+    parts = {}
+    for part in value.strip().upper().removeprefix("RRULE:").split(";"):
+        if not part:
+            continue
+        key, _, item = part.partition("=")
+        if not item or key in parts:
+            raise ValueError(f"Invalid RRULE part: {part}")
+        parts[key] = item
+    unsupported = set(parts) - {"FREQ", "INTERVAL", "COUNT", "UNTIL", "BYDAY"}
+    if unsupported:
+        raise ValueError(f"Unsupported RRULE parts: {', '.join(sorted(unsupported))}")
+    freq = parts.get("FREQ")
+    if freq not in FREQUENCIES:
+        raise ValueError("FREQ must be one of " + ", ".join(FREQUENCIES))
+    if "COUNT" in parts and "UNTIL" in parts:
+        raise ValueError("COUNT and UNTIL are mutually exclusive")
+
+    interval = int(parts.get("INTERVAL", "1"))
+    if interval < 1:
+        raise ValueError("INTERVAL must be positive")
+    count = None
+    if "COUNT" in parts:
+        count = int(parts["COUNT"])
+        if not 1 <= count <= RRULE_MAX_COUNT:
+            raise ValueError(f"COUNT must be between 1 and {RRULE_MAX_COUNT}")
+    until = _parse_until(parts["UNTIL"]) if "UNTIL" in parts else None
+    byday = None
+    if "BYDAY" in parts:
+        if freq != "WEEKLY":
+            raise ValueError("BYDAY is only supported for WEEKLY rules")
+        days = parts["BYDAY"].split(",")
+        if any(day not in WEEKDAYS for day in days):
+            raise ValueError("BYDAY must list weekdays (MO, TU, ...)")
+        byday = sorted({WEEKDAYS.index(day) for day in days})
+    return RecurrenceRule(freq, interval, count, until, byday)
+
+
+def _shift_months(start: datetime, months: int) -> Optional[datetime]:
+    year, month = divmod(start.month - 1 + months, 12)
+    try:
+        return start.replace(year=start.year + year, month=month + 1)
+    except ValueError:
+        # e.g. the 31st in a 30-day month
+        return None
+
+
+def _period_starts(rule: RecurrenceRule, dtstart: datetime, period: int) -> List[datetime]:
+    step = period * rule.interval
+    if rule.freq == "DAILY":
+        return [dtstart + timedelta(days=step)]
+    if rule.freq == "WEEKLY":
+        week = dtstart - timedelta(days=dtstart.weekday()) + timedelta(weeks=step)
+        days = rule.byday or [dtstart.weekday()]
+        starts = [
+            start
+            for start in (week + timedelta(days=day) for day in days)
+            if start >= dtstart
+        ]
+        if period == 0 and dtstart not in starts:
+            # DTSTART is always the first instance, on a BYDAY day or not, and
+            # counts toward COUNT (RFC 5545 3.8.5.3), as the ICS export says
+            starts.insert(0, dtstart)
+        return starts
+    start = _shift_months(dtstart, step if rule.freq == "MONTHLY" else step * 12)
+    return [start] if start is not None else []
+
+
+def _first_period(rule: RecurrenceRule, dtstart: datetime, at: datetime) -> int:
+    """The earliest period that can contain starts at or after `at`."""
+    if at <= dtstart:
+        return 0
+    if rule.freq == "DAILY":
+        return (at - dtstart).days // rule.interval
+    if rule.freq == "WEEKLY":
+        week = dtstart - timedelta(days=dtstart.weekday())
+        return (at - week).days // 7 // rule.interval
+    months = (at.year - dtstart.year) * 12 + at.month - dtstart.month
+    if rule.freq == "YEARLY":
+        return max(months // 12 // rule.interval - 1, 0)
+    return max(months // rule.interval - 1, 0)
+
+
+def iter_starts(
+    rule: RecurrenceRule, dtstart: datetime, after: Optional[datetime] = None
+) -> Iterator[datetime]:
+    """Occurrence starts in order, lazily and possibly without end.
+
+    With `after`, periods before it are skipped arithmetically, so reaching a
+    window far into the series costs nothing. COUNT rules are walked from the
+    start since the count depends on every earlier occurrence; they are short.
+    """
+    period = 0
+    if after is not None and rule.count is None:
+        period = _first_period(rule, dtstart, after)
+    emitted = 0
+    while True:
+        for start in _period_starts(rule, dtstart, period):
+            if rule.until is not None and start > rule.until:
+                return
+            if rule.count is not None and emitted >= rule.count:
+                return
+            emitted += 1
+            yield start
+        period += 1
+
+
+def series_end(
+    start_time: datetime, end_time: datetime, rrule: Optional[str]
+) -> Optional[datetime]:
+    """End of the last occurrence of a series; None for single or open-ended ones."""
+    if not rrule:
+        return None
+    rule = parse_rrule(rrule)
+    duration = end_time - start_time
+    if rule.until is not None:
+        return max(rule.until, start_time) + duration
+    if rule.count is not None:
+        last = start_time
+        for last in iter_starts(rule, start_time):
+            pass
+        return last + duration
+    return None
+
+
+def is_occurrence(event, start: datetime) -> bool:
+    if not event.rrule:
+        return start == event.start_time
+    rule = parse_rrule(event.rrule)
+    for candidate in iter_starts(rule, event.start_time, after=start):
+        if candidate >= start:
+            return candidate == start
+    return False
+
+
+Occurrence = Tuple[Optional[datetime], datetime, datetime]
+
+
+def occurrences(
+    event, window_start: datetime, window_end: datetime, exceptions=()
+) -> Iterator[Occurrence]:
+    """Yield `(original_start, start, end)` for occurrences overlapping the window.
+
+    `original_start` identifies the occurrence (RECURRENCE-ID) and is None for
+    single events. Cancelled occurrences are skipped and moved ones are yielded
+    at their new time, in start order with the rest.
+    """
+    duration = event.end_time - event.start_time
+    if not event.rrule:
+        if event.start_time < window_end and event.end_time > window_start:
+            yield None, event.start_time, event.end_time
+        return
+
+    overridden = {exception.original_start for exception in exceptions}
+    moved = sorted(
+        (
+            (exception.original_start, exception.start_time, exception.end_time)
+            for exception in exceptions
+            if not exception.cancelled
+            and exception.start_time < window_end
+            and exception.end_time > window_start
+        ),
+        key=lambda occurrence: occurrence[1],
+    )
+
+    def regular():
+        rule = parse_rrule(event.rrule)
+        for start in iter_starts(rule, event.start_time, after=window_start - duration):
+            if start >= window_end:
+                return
+            if start + duration > window_start and start not in overridden:
+                yield start, start, start + duration
+
+    yield from heapq.merge(regular(), moved, key=lambda occurrence: occurrence[1])
@@ -0,0 +1,180 @@
+"""Rebuild the search indices from Postgres without downtime.
+
+    python -m app.reindex [--kind post --kind event] [--chunk-size 1000]
+
+Rows are streamed with server-side cursors into a fresh versioned index, which
+then takes over the alias; searches keep hitting the old index until the swap.
+Writes to the index being rebuilt are paused meanwhile, while the other
+indices keep draining: every change to it committed after the snapshot stays
+in the outbox and is applied to the new index once it is live.
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+from elasticsearch import NotFoundError
+from elasticsearch.helpers import async_bulk
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from app.db import SessionLocal, engine
+from app.elastic import es
+from app.indexer import OUTBOX_LOCK_KEY, index_lock_key
+from app.models import Comment, Event, Post
+from app.search import (
+    INDEX_BY_KIND,
+    MAPPINGS,
+    comment_document,
+    event_document,
+    post_document,
+)
+
+PROGRESS_INTERVAL = 5
+
+
+def _post_actions(index: str):
+    query = select(Post)
+    return query, lambda row: (index, row[0].id, post_document(row[0]))
+
+
+def _comment_actions(index: str):
+    query = select(Comment, Post.channel_id).join(Post, Comment.post_id == Post.id)
+    return query, lambda row: (index, row[0].id, comment_document(*row))
+
+
+def _event_actions(index: str):
+    query = select(Event)
+    return query, lambda row: (index, row[0].id, event_document(row[0]))
+
+
+SOURCES = {"post": _post_actions, "comment": _comment_actions, "event": _event_actions}
+
+
+class Progress:
+    def __init__(self, label: str):
+        self.label = label
+        self.rows = 0
+        self.started = self.reported = time.perf_counter()
+
+    def add(self, count: int):
+        self.rows += count
+        now = time.perf_counter()
+        if now - self.reported >= PROGRESS_INTERVAL:
+            self.reported = now
+            self.report()
+
+    def report(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        print(
+            f"{self.label}: {self.rows} rows, {self.rows / elapsed:.0f} rows/s",
+            flush=True,
+        )
+
+
+async def stream_into(index: str, source, chunk_size: int, concurrency: int):
+    """Stream rows into `index`, keeping at most `concurrency` bulk requests in flight."""
+    query, to_action = source(index)
+    progress = Progress(index)
+    pending = set()
+
+    async def send(chunk):
+        await async_bulk(es, chunk, chunk_size=len(chunk), max_retries=5)
+        progress.add(len(chunk))
+
+    async with SessionLocal() as db:
+        rows = await db.stream(query.execution_options(yield_per=chunk_size))
+        async for partition in rows.partitions():
+            chunk = []
+            for row in partition:
+                target, doc_id, document = to_action(row)
+                chunk.append(
+                    {
+                        "_index": target,
+                        "_id": doc_id,
+                        "_source": document,
+                        # below any outbox id, so pending outbox writes win
+                        "version": 0,
+                        "version_type": "external",
+                    }
+                )
+            pending.add(asyncio.create_task(send(chunk)))
+            if len(pending) >= concurrency:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    task.result()
+    await asyncio.gather(*pending)
+    progress.report()
+
+
+async def current_indices(alias: str):
+    try:
+        return list(await es.indices.get_alias(name=alias))
+    except NotFoundError:
+        return []
+
+
+async def reindex_kind(kind: str, chunk_size: int, concurrency: int, keep_old: bool):
+    alias = INDEX_BY_KIND[kind]
+    new_index = f"{alias}-{datetime.utcnow():%Y%m%d%H%M%S}"
+    await es.indices.create(
+        index=new_index,
+        mappings=MAPPINGS[alias],
+        # no refreshes or replicas while bulk loading
+        settings={"refresh_interval": "-1", "number_of_replicas": 0},
+    )
+
+    lock_key = (OUTBOX_LOCK_KEY, index_lock_key(alias))
+    async with engine.connect() as lock_connection:
+        # waits for running drains; held at session level until the swap
+        await lock_connection.execute(select(func.pg_advisory_lock(*lock_key)))
+        await lock_connection.commit()
+        try:
+            await stream_into(new_index, SOURCES[kind], chunk_size, concurrency)
+
+            await es.indices.put_settings(
+                index=new_index,
+                settings={"refresh_interval": "1s", "number_of_replicas": 1},
+            )
+            await es.indices.refresh(index=new_index)
+
+            old_indices = await current_indices(alias)
+            actions = [
+                {"remove": {"index": index, "alias": alias}} for index in old_indices
+            ]
+            actions.append({"add": {"index": new_index, "alias": alias}})
+            await es.indices.update_aliases(actions=actions)
+            print(f"{alias} -> {new_index}", flush=True)
+        finally:
+            await lock_connection.execute(select(func.pg_advisory_unlock(*lock_key)))
+            await lock_connection.commit()
+
+    if not keep_old:
+        for index in old_indices:
+            await es.indices.delete(index=index)
+
+
+async def main(args):
+    try:
+        for kind in args.kind or list(INDEX_BY_KIND):
+            await reindex_kind(kind, args.chunk_size, args.concurrency, args.keep_old)
+    finally:
+        await es.close()
+        await engine.dispose()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--kind", action="append", choices=list(INDEX_BY_KIND))
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--keep-old", action="store_true", help="keep the previous index after the swap"
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -1,27 +1,130 @@
-from datetime import datetime
-import io
+import asyncio
+from datetime import datetime, timedelta
+import os
 import uuid
 from fastapi import (
+    BackgroundTasks,
+    Body,
     HTTPException,
     Depends,
     Response,
     UploadFile,
     File,
+    Header,
     APIRouter,
+    Query,
+    WebSocket,
+    WebSocketDisconnect,
     status,
 )
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import or_
-from typing import List, Optional
-from pydantic import BaseModel
-
-from app.ics import generate_ics
-from app.models import Channel, Event, Post, Comment, Media
-from app.db import get_db
-from app.keycloak_api import keycloak_admin
-from app.minio import get_minio_client, MINIO_BUCKET
-from app.auth import get_current_user
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import selectinload
+from sqlalchemy import (
+    DateTime,
+    String,
+    Text,
+    delete,
+    func,
+    insert,
+    literal,
+    update,
+)
+from typing import Any, Dict, List, Literal, Optional
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, field_validator
+from minio.error import S3Error
+
+from app.ics import (
+    calendar_begin,
+    calendar_end,
+    format_datetime,
+    generate_ics,
+    render_event,
+)
+from app.search import SEARCH_MAX_WINDOW, search_documents
+from app.media_store import (
+    PENDING_UPLOAD_GRACE,
+    register_object,
+    release_object,
+    store_fileobj,
+)
+from app.thumbnails import process_media
+from app.timeline import (
+    TIMELINE_COMMENTS,
+    TIMELINE_MAX_COMMENTS,
+    TIMELINE_MAX_MEDIA,
+    TIMELINE_MEDIA,
+    latest_per_post,
+)
+from app.sync import (
+    SYNC_MAX_PAGE_SIZE,
+    SYNC_PAGE_SIZE,
+    channel_deleted,
+    decode_sync_cursor,
+    load_changes,
+    record_deletion,
+)
+from app.models import (
+    Channel,
+    Event,
+    EventException,
+    FeedToken,
+    PendingUpload,
+    Post,
+    Comment,
+    Media,
+)
+from app.access import (
+    accessible_channel,
+    channel_children,
+    channel_member,
+    children_or_404,
+)
+from app.acl_cache import get_acl_cache
+from app.caching import (
+    channel_version,
+    etag_matches,
+    not_modified,
+    weak_etag,
+)
+from app.db import SessionLocal, get_db
+from app.elastic import get_es_client
+from app.outbox import (
+    enqueue_channel_delete,
+    enqueue_comment,
+    enqueue_event,
+    enqueue_event_delete,
+    enqueue_post,
+)
+from app.pagination import (
+    Page,
+    PageParams,
+    decode_cursor,
+    encode_cursor,
+    keyset_filter,
+    keyset_order,
+    paginate,
+)
+from app.recurrence import (
+    is_occurrence,
+    naive_utc,
+    occurrences,
+    parse_rrule,
+    series_end,
+)
+from app.user_directory import get_user_directory
+from app.minio import (
+    MINIO_PRESIGN_EXPIRY,
+    presigned_download_url,
+    presigned_upload_url,
+    stat_object,
+)
+from app.auth import get_current_user, verify_token
+from app.feed_tokens import get_feed_user, hash_feed_token, new_feed_token
+from app.broadcast import get_broadcast
+from app.bulk import BULK_MAX_ITEMS, BulkResult, insert_returning, validate_items
 
 router = APIRouter(prefix="/api/channels")
 
@@ -46,6 +149,8 @@ class ChannelOut(BaseModel):
     behaviorist_id: str
     created_at: Optional[datetime]
     updated_at: Optional[datetime]
+    version: int = 0
+    last_activity_at: Optional[datetime] = None
 
     class Config:
         orm_mode = True
@@ -62,8 +167,8 @@ class PostOut(BaseModel):
     title: str
     content: str
     channel_id: str
-    created_at: Optional[str]
-    updated_at: Optional[str]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
     author_id: str
 
     class Config:
@@ -80,7 +185,7 @@ class CommentOut(BaseModel):
     content: str
     post_id: str
     author_id: str
-    created_at: Optional[str]
+    created_at: Optional[datetime]
 
     class Config:
         orm_mode = True
@@ -90,12 +195,41 @@ class MediaOut(BaseModel):
     id: str
     post_id: str
     file_path: str
-    created_at: Optional[str]
+    # variant name -> object key; empty until processing finishes
+    variants: Optional[Dict[str, str]] = None
+    created_at: Optional[datetime]
 
     class Config:
         orm_mode = True
 
 
+class MediaUploadRequest(BaseModel):
+    filename: str
+    size: int
+
+    @field_validator("size")
+    @classmethod
+    def positive_size(cls, value):
+        if value <= 0:
+            raise ValueError("size must be positive")
+        return value
+
+
+class MediaUploadOut(BaseModel):
+    object_name: str
+    upload_url: str
+    expires_in: int
+
+
+class MediaConfirm(BaseModel):
+    object_name: str
+
+
+class MediaDownloadOut(BaseModel):
+    download_url: str
+    expires_in: int
+
+
 # ----------------------------
 # Channels endpoints
 # ----------------------------
@@ -107,10 +241,8 @@ async def create_channel(
     user=Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    client = keycloak_admin.get_users({"email": channel_in.client_email})
-    if len(client) > 0:
-        client_id = client[0].get("id")
-    else:
+    client_id = await get_user_directory().get_user_id(channel_in.client_email)
+    if client_id is None:
         # Jeśli klient nie istnieje – symulujemy wysłanie linku zaproszenia
         invitation_link = f"http://example.com/invite?email={channel_in.client_email}"
         print(f"Invitation link sent to {channel_in.client_email}: {invitation_link}")
@@ -131,34 +263,42 @@ async def create_channel(
     return new_channel
 
 
-@router.get("/channels", response_model=List[ChannelOut])
+@router.get("/channels", response_model=Page[ChannelOut])
 async def list_channels(
-    user=Depends(get_current_user), db: AsyncSession = Depends(get_db)
+    page: PageParams = Depends(),
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
     result = await db.execute(
-        select(Channel).where(
-            or_(Channel.behaviorist_id == user["sub"], Channel.client_id == user["sub"])
+        select(Channel)
+        .where(
+            channel_member(user["sub"]),
+            *keyset_filter(Channel, page.cursor, descending=True),
         )
+        .order_by(*keyset_order(Channel, descending=True))
+        .limit(page.limit + 1)
     )
-    channels = result.scalars().all()
-    return channels
+    return paginate(result.scalars().all(), page.limit)
 
 
 @router.get("/channels/{channel_id}", response_model=ChannelOut)
 async def get_channel(
-    channel_id: str, user=Depends(get_current_user), db: AsyncSession = Depends(get_db)
+    channel_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
     result = await db.execute(
-        select(Channel).where(
-            Channel.id == channel_id,
-            or_(
-                Channel.behaviorist_id == user["sub"], Channel.client_id == user["sub"]
-            ),
-        )
+        select(Channel).where(accessible_channel(channel_id, user["sub"]))
     )
     channel = result.scalars().first()
     if not channel:
         raise HTTPException(status_code=404, detail="Channel not found")
+    etag = weak_etag(channel.id, channel.version, channel.updated_at)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
     return channel
 
 
@@ -169,24 +309,26 @@ async def update_channel(
     user=Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(
-        select(Channel).where(
-            Channel.id == channel_id,
-            or_(
-                Channel.behaviorist_id == user["sub"], Channel.client_id == user["sub"]
-            ),
+    values = {}
+    if channel_data.name is not None:
+        values["name"] = channel_data.name
+    if channel_data.description is not None:
+        values["description"] = channel_data.description
+    if values:
+        query = (
+            update(Channel)
+            .where(accessible_channel(channel_id, user["sub"]))
+            .values(**values, version=Channel.version + 1)
+            .returning(Channel)
         )
-    )
+    else:
+        query = select(Channel).where(accessible_channel(channel_id, user["sub"]))
+    result = await db.execute(query)
     channel = result.scalars().first()
     if not channel:
         raise HTTPException(status_code=404, detail="Channel not found")
-    if channel_data.name is not None:
-        channel.name = channel_data.name
-    if channel_data.description is not None:
-        channel.description = channel_data.description
-    db.add(channel)
     await db.commit()
-    await db.refresh(channel)
+    await get_acl_cache().invalidate_channel(channel_id)
     return channel
 
 
@@ -194,22 +336,145 @@ async def update_channel(
 async def delete_channel(
     channel_id: str, user=Depends(get_current_user), db: AsyncSession = Depends(get_db)
 ):
+    # posts, comments, media and events go with it via ON DELETE CASCADE
     result = await db.execute(
-        select(Channel).where(
-            Channel.id == channel_id,
-            or_(
-                Channel.behaviorist_id == user["sub"], Channel.client_id == user["sub"]
-            ),
-        )
+        delete(Channel)
+        .where(accessible_channel(channel_id, user["sub"]))
+        .returning(Channel.behaviorist_id, Channel.client_id)
     )
-    channel = result.scalars().first()
-    if not channel:
+    members = result.first()
+    if members is None:
         raise HTTPException(status_code=404, detail="Channel not found")
-    await db.delete(channel)
+    enqueue_channel_delete(db, channel_id)
+    record_deletion(db, channel_id, "channel", channel_id, list(members))
     await db.commit()
+    await get_acl_cache().invalidate_channel(channel_id)
     return
 
 
+# ----------------------------
+# Realtime feed
+# ----------------------------
+
+
+def publish_channel_event(channel_id: str, event_type: str, schema, obj):
+    data = schema.model_validate(obj, from_attributes=True)
+    get_broadcast().publish(
+        channel_id,
+        {
+            "type": event_type,
+            "channel_id": channel_id,
+            "data": data.model_dump(mode="json"),
+        },
+    )
+
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+
+@router.websocket("/channels/{channel_id}/ws")
+async def channel_feed(
+    websocket: WebSocket,
+    channel_id: str,
+    token: Optional[str] = None,
+    last_id: Optional[str] = None,
+):
+    # browsers cannot set headers on websockets, so the token may come as ?token=
+    if token is None:
+        scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+        token = credentials if scheme.lower() == "bearer" else None
+    try:
+        user = await verify_token(token) if token else None
+    except HTTPException:
+        user = None
+    if user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    # a short-lived session, so open sockets do not hold pool connections
+    async with SessionLocal() as db:
+        allowed = await get_acl_cache().is_member(db, user["sub"], channel_id)
+    if not allowed:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    broadcast = get_broadcast()
+    hub = broadcast.hub
+    # no await between reading the backlog and subscribing, so nothing is missed
+    backlog = broadcast.replay.since(channel_id, last_id) if last_id else []
+    subscription = hub.subscribe(channel_id)
+    disconnected = asyncio.create_task(_wait_for_disconnect(websocket))
+    try:
+        if backlog is None:
+            # last_id fell out of the replay buffer; the client must refetch
+            backlog = [{"type": "resync", "channel_id": channel_id}]
+        for message in backlog:
+            await websocket.send_json(message)
+        while True:
+            next_message = asyncio.create_task(subscription.queue.get())
+            await asyncio.wait(
+                {next_message, disconnected}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if disconnected.done():
+                next_message.cancel()
+                break
+            if subscription.dropped:
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+                break
+            await websocket.send_json(next_message.result())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        disconnected.cancel()
+        hub.unsubscribe(subscription)
+
+
+# ----------------------------
+# Search endpoints
+# ----------------------------
+
+
+class SearchHit(BaseModel):
+    kind: Literal["post", "comment", "event"]
+    id: str
+    channel_id: str
+    score: Optional[float]
+    highlight: Dict[str, List[str]]
+    document: Dict[str, Any]
+
+
+class SearchOut(BaseModel):
+    items: List[SearchHit]
+    total: int
+    next_offset: Optional[int]
+
+
+@router.get("/search", response_model=SearchOut)
+async def search(
+    q: str = Query(..., min_length=1),
+    kind: Optional[List[Literal["post", "comment", "event"]]] = Query(None),
+    channel_id: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    if offset + limit > SEARCH_MAX_WINDOW:
+        raise HTTPException(status_code=400, detail="Result window is too large")
+    query = select(Channel.id).where(channel_member(user["sub"]))
+    if channel_id is not None:
+        query = query.where(Channel.id == channel_id)
+    result = await db.execute(query)
+    channel_ids = result.scalars().all()
+    return await search_documents(
+        get_es_client(), q, channel_ids, kinds=kind, offset=offset, limit=limit
+    )
+
+
 # ----------------------------
 # Posts endpoints
 # ----------------------------
@@ -222,48 +487,161 @@ async def create_post(
     user=Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
+    # inserts nothing unless the channel exists and the user belongs to it
     result = await db.execute(
-        select(Channel).where(
-            Channel.id == channel_id,
-            or_(
-                Channel.behaviorist_id == user["sub"], Channel.client_id == user["sub"]
-            ),
+        insert(Post)
+        .from_select(
+            ["title", "content", "channel_id", "author_id"],
+            select(
+                literal(post_in.title),
+                literal(post_in.content),
+                Channel.id,
+                literal(post_in.author_id),
+            ).where(accessible_channel(channel_id, user["sub"])),
         )
+        .returning(Post)
     )
-    channel = result.scalars().first()
-    if not channel:
+    new_post = result.scalars().first()
+    if not new_post:
         raise HTTPException(status_code=404, detail="Channel not found")
-    new_post = Post(
-        title=post_in.title,
-        content=post_in.content,
-        channel_id=channel_id,
-        author_id=post_in.author_id,
-    )
-    db.add(new_post)
+    enqueue_post(db, new_post)
     await db.commit()
-    await db.refresh(new_post)
+    acl_cache = get_acl_cache()
+    await acl_cache.invalidate_channel(channel_id)
+    await acl_cache.remember_post(new_post.id, channel_id)
+    publish_channel_event(channel_id, "post.created", PostOut, new_post)
     return new_post
 
 
-@router.get("/channels/{channel_id}/posts", response_model=List[PostOut])
+@router.post("/channels/{channel_id}/posts/bulk", response_model=BulkResult[PostOut])
+async def create_posts(
+    channel_id: str,
+    items: List[Dict[str, Any]] = Body(..., max_length=BULK_MAX_ITEMS),
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Create many posts in one transaction; invalid items are reported, not fatal."""
+    acl_cache = get_acl_cache()
+    await acl_cache.require_channel(db, user["sub"], channel_id)
+    valid, errors = validate_items(PostCreate, items)
+    new_posts = await insert_returning(
+        db,
+        Post,
+        [
+            {
+                "title": post_in.title,
+                "content": post_in.content,
+                "channel_id": channel_id,
+                "author_id": post_in.author_id,
+            }
+            for _, post_in in valid
+        ],
+    )
+    for new_post in new_posts:
+        enqueue_post(db, new_post)
+    await db.commit()
+    await acl_cache.invalidate_channel(channel_id)
+    for new_post in new_posts:
+        await acl_cache.remember_post(new_post.id, channel_id)
+        publish_channel_event(channel_id, "post.created", PostOut, new_post)
+    return {"items": new_posts, "errors": errors}
+
+
+@router.get("/channels/{channel_id}/posts", response_model=Page[PostOut])
 async def list_posts(
-    channel_id: str, user=Depends(get_current_user), db: AsyncSession = Depends(get_db)
+    channel_id: str,
+    response: Response,
+    page: PageParams = Depends(),
+    if_none_match: Optional[str] = Header(None),
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
-    channel_cond = Channel.id == channel_id
-    channel_user_cond = or_(
-        Channel.behaviorist_id == user["sub"], Channel.client_id == user["sub"]
+    result = await db.execute(channel_version(channel_id, user["sub"]))
+    version = result.scalar()
+    if version is None:
+        raise HTTPException(status_code=404, detail="Channel not found")
+    etag = weak_etag("posts", channel_id, version, page.cursor, page.limit)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+
+    result = await db.execute(
+        channel_children(
+            Post,
+            channel_id,
+            user["sub"],
+            *keyset_filter(Post, page.cursor, descending=True),
+        )
+        .order_by(*keyset_order(Post, descending=True))
+        .limit(page.limit + 1)
     )
-    query = select(Channel).where(
-        channel_cond,
-        channel_user_cond,
+    return paginate(children_or_404(result.all()), page.limit)
+
+
+class TimelinePostOut(PostOut):
+    comment_count: int = 0
+    latest_comments: List[CommentOut] = []
+    media_count: int = 0
+    media: List[MediaOut] = []
+
+
+class TimelineOut(Page[TimelinePostOut]):
+    channel: ChannelOut
+
+
+@router.get("/channels/{channel_id}/timeline", response_model=TimelineOut)
+async def channel_timeline(
+    channel_id: str,
+    response: Response,
+    page: PageParams = Depends(),
+    comments: int = Query(TIMELINE_COMMENTS, ge=0, le=TIMELINE_MAX_COMMENTS),
+    media: int = Query(TIMELINE_MEDIA, ge=0, le=TIMELINE_MAX_MEDIA),
+    if_none_match: Optional[str] = Header(None),
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """A page of posts with their newest comments and media, in four queries."""
+    result = await db.execute(
+        select(Channel).where(accessible_channel(channel_id, user["sub"]))
     )
-    result = await db.execute(query)
     channel = result.scalars().first()
     if not channel:
         raise HTTPException(status_code=404, detail="Channel not found")
-    result = await db.execute(select(Post).where(Post.channel_id == channel_id))
-    posts = result.scalars().all()
-    return posts
+    etag = weak_etag(
+        "timeline", channel_id, channel.version, page.cursor, page.limit, comments, media
+    )
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+
+    result = await db.execute(
+        select(Post)
+        .where(
+            Post.channel_id == channel_id,
+            *keyset_filter(Post, page.cursor, descending=True),
+        )
+        .order_by(*keyset_order(Post, descending=True))
+        .limit(page.limit + 1)
+    )
+    timeline = paginate(result.scalars().all(), page.limit)
+    post_ids = [post.id for post in timeline["items"]]
+    latest_comments = await latest_per_post(db, Comment, post_ids, comments)
+    latest_media = await latest_per_post(db, Media, post_ids, media)
+
+    items = []
+    for post in timeline["items"]:
+        post_comments, comment_count = latest_comments.get(post.id, ([], 0))
+        post_media, media_count = latest_media.get(post.id, ([], 0))
+        items.append(
+            {
+                **PostOut.model_validate(post, from_attributes=True).model_dump(),
+                "comment_count": comment_count,
+                "latest_comments": post_comments,
+                "media_count": media_count,
+                "media": post_media,
+            }
+        )
+    return {"channel": channel, "items": items, "next_cursor": timeline["next_cursor"]}
 
 
 # ----------------------------
@@ -278,49 +656,110 @@ async def create_comment(
     user=Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(select(Post).where(Post.id == post_id))
-    post = result.scalars().first()
-    if not post:
-        raise HTTPException(status_code=404, detail="Post not found")
+    channel_id = await get_acl_cache().require_post(db, user["sub"], post_id)
     new_comment = Comment(
         content=comment_in.content, post_id=post_id, author_id=user.get("sub")
     )
     db.add(new_comment)
+    # flush loads id and created_at via RETURNING for the search document
+    await db.flush()
+    enqueue_comment(db, new_comment, channel_id)
     await db.commit()
-    await db.refresh(new_comment)
+    publish_channel_event(channel_id, "comment.created", CommentOut, new_comment)
     return new_comment
 
 
-@router.get("/posts/{post_id}/comments", response_model=List[CommentOut])
-async def list_comments(post_id: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Comment).where(Comment.post_id == post_id))
-    comments = result.scalars().all()
-    return comments
+class BulkCommentCreate(CommentCreate):
+    post_id: str
+
+
+@router.post(
+    "/channels/{channel_id}/comments/bulk", response_model=BulkResult[CommentOut]
+)
+async def create_comments(
+    channel_id: str,
+    items: List[Dict[str, Any]] = Body(..., max_length=BULK_MAX_ITEMS),
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Create comments on any posts of a channel in one transaction."""
+    await get_acl_cache().require_channel(db, user["sub"], channel_id)
+    valid, errors = validate_items(BulkCommentCreate, items)
+    result = await db.execute(
+        select(Post.id).where(
+            Post.channel_id == channel_id,
+            Post.id.in_({comment_in.post_id for _, comment_in in valid}),
+        )
+    )
+    post_ids = set(result.scalars().all())
+    rows = []
+    for index, comment_in in valid:
+        if comment_in.post_id not in post_ids:
+            errors.append({"index": index, "detail": "Post not found"})
+            continue
+        rows.append(
+            {
+                "content": comment_in.content,
+                "post_id": comment_in.post_id,
+                "author_id": user["sub"],
+            }
+        )
+    errors.sort(key=lambda error: error["index"])
+    new_comments = await insert_returning(db, Comment, rows)
+    for new_comment in new_comments:
+        enqueue_comment(db, new_comment, channel_id)
+    await db.commit()
+    for new_comment in new_comments:
+        publish_channel_event(channel_id, "comment.created", CommentOut, new_comment)
+    return {"items": new_comments, "errors": errors}
+
+
+@router.get("/posts/{post_id}/comments", response_model=Page[CommentOut])
+async def list_comments(
+    post_id: str,
+    response: Response,
+    page: PageParams = Depends(),
+    if_none_match: Optional[str] = Header(None),
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    channel_id = await get_acl_cache().require_post(db, user["sub"], post_id)
+    result = await db.execute(channel_version(channel_id))
+    version = result.scalar()
+    etag = weak_etag("comments", post_id, version, page.cursor, page.limit)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+
+    result = await db.execute(
+        select(Comment)
+        .where(Comment.post_id == post_id, *keyset_filter(Comment, page.cursor))
+        .order_by(*keyset_order(Comment))
+        .limit(page.limit + 1)
+    )
+    return paginate(result.scalars().all(), page.limit)
+
+
+async def _process_media_variants(media_id: str, channel_id: str):
+    # runs after the response; thumbnails and posters are rendered in a process pool
+    media = await process_media(media_id)
+    if media is not None:
+        publish_channel_event(channel_id, "media.updated", MediaOut, media)
 
 
 @router.post("/posts/{post_id}/media", response_model=MediaOut)
 async def upload_media(
     post_id: str,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     user=Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(select(Post).where(Post.id == post_id))
-    post = result.scalars().first()
-    if not post:
-        raise HTTPException(status_code=404, detail="Post not found")
+    channel_id = await get_acl_cache().require_post(db, user["sub"], post_id)
 
-    minio_client = get_minio_client()
-    file_content = await file.read()
-    file_name = f"{uuid.uuid4()}_{file.filename}"
+    # identical bytes share one object; repeat uploads skip MinIO entirely
     try:
-        minio_client.put_object(
-            MINIO_BUCKET,
-            file_name,
-            data=io.BytesIO(file_content),
-            length=len(file_content),
-            content_type=file.content_type,
-        )
+        file_name = await store_fileobj(db, file.file, content_type=file.content_type)
     except Exception as e:
         raise HTTPException(status_code=500, detail="Media upload failed")
 
@@ -328,18 +767,128 @@ async def upload_media(
     db.add(new_media)
     await db.commit()
     await db.refresh(new_media)
+    publish_channel_event(channel_id, "media.created", MediaOut, new_media)
+    background_tasks.add_task(_process_media_variants, new_media.id, channel_id)
+    return new_media
+
+
+@router.post("/posts/{post_id}/media/upload_url", response_model=MediaUploadOut)
+async def create_media_upload_url(
+    post_id: str,
+    upload_in: MediaUploadRequest,
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    await get_acl_cache().require_post(db, user["sub"], post_id)
+
+    # the post prefix lets confirm_media_upload reject keys of other posts
+    object_name = f"{post_id}/{uuid.uuid4()}_{os.path.basename(upload_in.filename)}"
+    # until confirmed, only this row refers to the object; the media GC
+    # removes it once it expires
+    db.add(
+        PendingUpload(
+            object_name=object_name,
+            post_id=post_id,
+            created_by=user["sub"],
+            size=upload_in.size,
+            expires_at=datetime.utcnow()
+            + timedelta(seconds=MINIO_PRESIGN_EXPIRY + PENDING_UPLOAD_GRACE),
+        )
+    )
+    await db.commit()
+    return MediaUploadOut(
+        object_name=object_name,
+        upload_url=presigned_upload_url(object_name),
+        expires_in=MINIO_PRESIGN_EXPIRY,
+    )
+
+
+@router.post("/posts/{post_id}/media/confirm", response_model=MediaOut)
+async def confirm_media_upload(
+    post_id: str,
+    confirm_in: MediaConfirm,
+    background_tasks: BackgroundTasks,
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    if not confirm_in.object_name.startswith(f"{post_id}/"):
+        raise HTTPException(status_code=400, detail="Object does not belong to post")
+    channel_id = await get_acl_cache().require_post(db, user["sub"], post_id)
+    # on any error below the row stays, and the GC removes the object later
+    result = await db.execute(
+        delete(PendingUpload)
+        .where(
+            PendingUpload.object_name == confirm_in.object_name,
+            PendingUpload.created_by == user["sub"],
+        )
+        .returning(PendingUpload.size)
+    )
+    expected_size = result.scalar()
+    if expected_size is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if not await register_object(db, confirm_in.object_name):
+        raise HTTPException(status_code=409, detail="Upload already confirmed")
+
+    try:
+        stat = await stat_object(confirm_in.object_name)
+    except S3Error as e:
+        if e.code == "NoSuchKey":
+            raise HTTPException(status_code=404, detail="Uploaded object not found")
+        raise HTTPException(status_code=500, detail="Media upload check failed")
+    if stat.size != expected_size:
+        raise HTTPException(status_code=400, detail="Uploaded size does not match")
+
+    new_media = Media(
+        post_id=post_id, file_path=confirm_in.object_name, created_by=user["sub"]
+    )
+    db.add(new_media)
+    await db.commit()
+    await db.refresh(new_media)
+    publish_channel_event(channel_id, "media.created", MediaOut, new_media)
+    background_tasks.add_task(_process_media_variants, new_media.id, channel_id)
     return new_media
 
 
+@router.get(
+    "/posts/{post_id}/media/{media_id}/download_url", response_model=MediaDownloadOut
+)
+async def create_media_download_url(
+    post_id: str,
+    media_id: str,
+    variant: Optional[str] = Query(None),
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    await get_acl_cache().require_post(db, user["sub"], post_id)
+    result = await db.execute(
+        select(Media.file_path, Media.variants).where(
+            Media.id == media_id, Media.post_id == post_id
+        )
+    )
+    row = result.first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Media not found")
+    file_path = row.file_path
+    if variant is not None:
+        file_path = (row.variants or {}).get(variant)
+        if file_path is None:
+            raise HTTPException(status_code=404, detail="Variant not found")
+    return MediaDownloadOut(
+        download_url=presigned_download_url(file_path),
+        expires_in=MINIO_PRESIGN_EXPIRY,
+    )
+
+
 @router.delete(
     "/posts/{post_id}/media/{media_id}", status_code=status.HTTP_204_NO_CONTENT
 )
 async def delete_media(
     post_id: str,
-    media_id: int,
+    media_id: str,
     user=Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
+    channel_id = await get_acl_cache().require_post(db, user["sub"], post_id)
     result = await db.execute(
         select(Media).where(
             Media.id == media_id,
@@ -351,26 +900,48 @@ async def delete_media(
     if not media:
         raise HTTPException(status_code=404, detail="Media not found")
 
-    minio_client = get_minio_client()
+    await db.delete(media)
+    await db.flush()
     try:
-        minio_client.remove_object(MINIO_BUCKET, media.file_path)
+        await release_object(db, media.file_path)
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Media deletion failed in MinIO: {e}"
         )
 
-    await db.delete(media)
+    record_deletion(db, channel_id, "media", media_id)
     await db.commit()
 
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
+EVENTS_MAX_WINDOW_DAYS = int(os.getenv("EVENTS_MAX_WINDOW_DAYS", "366"))
+
+
+def _check_rrule(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    parse_rrule(value)
+    return value.strip().upper().removeprefix("RRULE:")
+
+
 class EventCreate(BaseModel):
     title: str
     description: Optional[str] = None
     start_time: datetime
     end_time: datetime
     location: Optional[str] = None
+    rrule: Optional[str] = None
+
+    @field_validator("rrule")
+    @classmethod
+    def check_rrule(cls, value):
+        return _check_rrule(value)
+
+    @field_validator("start_time", "end_time")
+    @classmethod
+    def to_naive_utc(cls, value):
+        return naive_utc(value)
 
 
 class EventUpdate(BaseModel):
@@ -379,6 +950,28 @@ class EventUpdate(BaseModel):
     start_time: Optional[datetime] = None
     end_time: Optional[datetime] = None
     location: Optional[str] = None
+    # an explicit null turns a series back into a single event
+    rrule: Optional[str] = None
+
+    @field_validator("rrule")
+    @classmethod
+    def check_rrule(cls, value):
+        return _check_rrule(value)
+
+    @field_validator("start_time", "end_time")
+    @classmethod
+    def to_naive_utc(cls, value):
+        return naive_utc(value)
+
+
+class OccurrenceMove(BaseModel):
+    start_time: datetime
+    end_time: datetime
+
+    @field_validator("start_time", "end_time")
+    @classmethod
+    def to_naive_utc(cls, value):
+        return naive_utc(value)
 
 
 class EventOut(BaseModel):
@@ -388,6 +981,10 @@ class EventOut(BaseModel):
     description: Optional[str]
     start_time: datetime
     end_time: datetime
+    rrule: Optional[str] = None
+    recurrence_end: Optional[datetime] = None
+    # start of the occurrence as generated by the rule, in windowed listings
+    recurrence_id: Optional[datetime] = None
     created_at: Optional[datetime]
     updated_at: Optional[datetime]
     created_by: str
@@ -403,42 +1000,198 @@ async def create_event(
     user=Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(select(Channel).where(Channel.id == channel_id))
-    channel = result.scalars().first()
-    if not channel:
+    result = await db.execute(
+        insert(Event)
+        .from_select(
+            [
+                "channel_id",
+                "title",
+                "description",
+                "location",
+                "start_time",
+                "end_time",
+                "rrule",
+                "recurrence_end",
+                "created_by",
+            ],
+            select(
+                Channel.id,
+                literal(event_in.title),
+                literal(event_in.description, Text),
+                literal(event_in.location, String),
+                literal(event_in.start_time, DateTime),
+                literal(event_in.end_time, DateTime),
+                literal(event_in.rrule, String),
+                literal(
+                    series_end(event_in.start_time, event_in.end_time, event_in.rrule),
+                    DateTime,
+                ),
+                literal(user["sub"]),
+            ).where(accessible_channel(channel_id, user["sub"])),
+        )
+        .returning(Event)
+    )
+    new_event = result.scalars().first()
+    if not new_event:
         raise HTTPException(status_code=404, detail="Channel not found")
+    enqueue_event(db, new_event)
+    await db.commit()
+    publish_channel_event(channel_id, "event.created", EventOut, new_event)
+    return new_event
 
-    new_event = Event(
-        channel_id=channel_id,
-        title=event_in.title,
-        description=event_in.description,
-        start_time=event_in.start_time,
-        end_time=event_in.end_time,
-        created_by=user["sub"],
+
+@router.post("/channels/{channel_id}/events/bulk", response_model=BulkResult[EventOut])
+async def create_events(
+    channel_id: str,
+    items: List[Dict[str, Any]] = Body(..., max_length=BULK_MAX_ITEMS),
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Create many events in one transaction; invalid items are reported, not fatal."""
+    await get_acl_cache().require_channel(db, user["sub"], channel_id)
+    valid, errors = validate_items(EventCreate, items)
+    new_events = await insert_returning(
+        db,
+        Event,
+        [
+            {
+                "channel_id": channel_id,
+                "title": event_in.title,
+                "description": event_in.description,
+                "location": event_in.location,
+                "start_time": event_in.start_time,
+                "end_time": event_in.end_time,
+                "rrule": event_in.rrule,
+                "recurrence_end": series_end(
+                    event_in.start_time, event_in.end_time, event_in.rrule
+                ),
+                "created_by": user["sub"],
+            }
+            for _, event_in in valid
+        ],
     )
-    db.add(new_event)
+    for new_event in new_events:
+        enqueue_event(db, new_event)
     await db.commit()
-    await db.refresh(new_event)
-    return new_event
+    for new_event in new_events:
+        publish_channel_event(channel_id, "event.created", EventOut, new_event)
+    return {"items": new_events, "errors": errors}
+
+
+def _check_window(window_start: Optional[datetime], window_end: Optional[datetime]):
+    """The window as naive UTC, or a 400 if it is missing, empty or too long."""
+    window_start, window_end = naive_utc(window_start), naive_utc(window_end)
+    if window_start is None or window_end is None or window_end <= window_start:
+        raise HTTPException(status_code=400, detail="Invalid time window")
+    if window_end - window_start > timedelta(days=EVENTS_MAX_WINDOW_DAYS):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Time window exceeds {EVENTS_MAX_WINDOW_DAYS} days",
+        )
+    return window_start, window_end
+
+
+def _overlapping(window_start: datetime, window_end: datetime):
+    # served by the GiST index on (channel_id, during)
+    return Event.during.overlaps(func.tsrange(window_start, window_end))
 
 
-@router.get("/channels/{channel_id}/events", response_model=List[EventOut])
+def _occurrence_items(event: Event, window_start: datetime, window_end: datetime):
+    """EventOut dicts for the event's occurrences in the window."""
+    event_out = EventOut.model_validate(event, from_attributes=True).model_dump()
+    for original_start, start, end in occurrences(
+        event, window_start, window_end, event.exceptions
+    ):
+        yield {
+            **event_out,
+            "start_time": start,
+            "end_time": end,
+            "recurrence_id": original_start,
+        }
+
+
+@router.get("/channels/{channel_id}/events", response_model=Page[EventOut])
 async def list_events(
-    channel_id: str, user=Depends(get_current_user), db: AsyncSession = Depends(get_db)
+    channel_id: str,
+    response: Response,
+    page: PageParams = Depends(),
+    window_start: Optional[datetime] = Query(None, alias="from"),
+    window_end: Optional[datetime] = Query(None, alias="to"),
+    if_none_match: Optional[str] = Header(None),
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(select(Event).where(Event.channel_id == channel_id))
-    events = result.scalars().all()
-    return events
+    """Events by creation time, or with `from`/`to`, occurrences in that window.
+
+    Windowed listings expand recurring events into their occurrences, ordered
+    by start time.
+    """
+    windowed = window_start is not None or window_end is not None
+    if windowed:
+        window_start, window_end = _check_window(window_start, window_end)
+
+    result = await db.execute(channel_version(channel_id, user["sub"]))
+    version = result.scalar()
+    if version is None:
+        raise HTTPException(status_code=404, detail="Channel not found")
+    etag = weak_etag(
+        "events", channel_id, version, page.cursor, page.limit, window_start, window_end
+    )
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+
+    if not windowed:
+        result = await db.execute(
+            channel_children(
+                Event, channel_id, user["sub"], *keyset_filter(Event, page.cursor)
+            )
+            .order_by(*keyset_order(Event))
+            .limit(page.limit + 1)
+        )
+        return paginate(children_or_404(result.all()), page.limit)
+
+    result = await db.execute(
+        channel_children(
+            Event,
+            channel_id,
+            user["sub"],
+            _overlapping(window_start, window_end),
+        ).options(selectinload(Event.exceptions))
+    )
+    after = decode_cursor(page.cursor) if page.cursor else None
+    items = [
+        item
+        for event in children_or_404(result.all())
+        for item in _occurrence_items(event, window_start, window_end)
+        if after is None or (item["start_time"], item["id"]) > after
+    ]
+    items.sort(key=lambda item: (item["start_time"], item["id"]))
+    next_cursor = None
+    if len(items) > page.limit:
+        items = items[: page.limit]
+        next_cursor = encode_cursor(items[-1]["start_time"], items[-1]["id"])
+    return {"items": items, "next_cursor": next_cursor}
 
 
 @router.get("/events/{event_id}", response_model=EventOut)
 async def get_event(
-    event_id: str, user=Depends(get_current_user), db: AsyncSession = Depends(get_db)
+    event_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
     result = await db.execute(select(Event).where(Event.id == event_id))
     event = result.scalars().first()
-    if not event:
+    if not event or not await get_acl_cache().is_member(
+        db, user["sub"], event.channel_id
+    ):
         raise HTTPException(status_code=404, detail="Event not found")
+    etag = weak_etag(event.id, event.created_at, event.updated_at)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
     return event
 
 
@@ -460,14 +1213,32 @@ async def update_event(
         event.title = event_update.title
     if event_update.description is not None:
         event.description = event_update.description
+    rescheduled = False
     if event_update.start_time is not None:
+        rescheduled = event.start_time != event_update.start_time
         event.start_time = event_update.start_time
     if event_update.end_time is not None:
         event.end_time = event_update.end_time
+    if "rrule" in event_update.model_fields_set:
+        rescheduled = rescheduled or event.rrule != event_update.rrule
+        event.rrule = event_update.rrule
+    try:
+        event.recurrence_end = series_end(event.start_time, event.end_time, event.rrule)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if rescheduled:
+        # exceptions point at occurrences of the old schedule
+        await db.execute(
+            delete(EventException).where(EventException.event_id == event.id)
+        )
+        event.moved_start = event.moved_end = None
 
     db.add(event)
-    await db.commit()
+    await db.flush()
     await db.refresh(event)
+    enqueue_event(db, event)
+    await db.commit()
+    publish_channel_event(event.channel_id, "event.updated", EventOut, event)
     return event
 
 
@@ -476,13 +1247,102 @@ async def delete_event(
     event_id: str, user=Depends(get_current_user), db: AsyncSession = Depends(get_db)
 ):
     result = await db.execute(
-        select(Event).where(Event.id == event_id, created_by=user["sub"])
+        select(Event).where(Event.id == event_id, Event.created_by == user["sub"])
     )
     event = result.scalars().first()
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     await db.delete(event)
+    # delete (and lock) the row before the outbox entry takes its id, so the
+    # entry is ordered after any concurrent update's
+    await db.flush()
+    enqueue_event_delete(db, event_id)
+    record_deletion(db, event.channel_id, "event", event_id)
+    await db.commit()
+    get_broadcast().publish(
+        event.channel_id,
+        {
+            "type": "event.deleted",
+            "channel_id": event.channel_id,
+            "data": {"id": event_id},
+        },
+    )
+    return
+
+
+async def _touch_own_event(
+    db: AsyncSession, event_id: str, user_sub: str, **values
+) -> Event:
+    """Lock the user's event and bump updated_at, which also bumps the channel version."""
+    result = await db.execute(
+        update(Event)
+        .where(Event.id == event_id, Event.created_by == user_sub)
+        .values(updated_at=func.now(), **values)
+        .returning(Event)
+        .execution_options(populate_existing=True)
+    )
+    event = result.scalars().first()
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return event
+
+
+async def _save_exception(db: AsyncSession, event: Event, original_start: datetime, **values):
+    if not is_occurrence(event, original_start):
+        raise HTTPException(status_code=404, detail="Occurrence not found")
+    await db.execute(
+        pg_insert(EventException)
+        .values(event_id=event.id, original_start=original_start, **values)
+        .on_conflict_do_update(
+            index_elements=["event_id", "original_start"], set_=values
+        )
+    )
+
+
+@router.put("/events/{event_id}/occurrences/{occurrence_start}", response_model=EventOut)
+async def move_occurrence(
+    event_id: str,
+    occurrence_start: datetime,
+    move: OccurrenceMove,
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    occurrence_start = naive_utc(occurrence_start)
+    event = await _touch_own_event(
+        db,
+        event_id,
+        user["sub"],
+        # the new time may fall outside the series; this widens `during` to it
+        moved_start=func.least(Event.moved_start, move.start_time),
+        moved_end=func.greatest(Event.moved_end, move.end_time),
+    )
+    await _save_exception(
+        db,
+        event,
+        occurrence_start,
+        cancelled=False,
+        start_time=move.start_time,
+        end_time=move.end_time,
+    )
     await db.commit()
+    publish_channel_event(event.channel_id, "event.updated", EventOut, event)
+    return event
+
+
+@router.delete("/events/{event_id}/occurrences/{occurrence_start}", status_code=204)
+async def cancel_occurrence(
+    event_id: str,
+    occurrence_start: datetime,
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    occurrence_start = naive_utc(occurrence_start)
+    event = await _touch_own_event(db, event_id, user["sub"])
+    await _save_exception(
+        db, event, occurrence_start, cancelled=True, start_time=None, end_time=None
+    )
+    await db.commit()
+    publish_channel_event(event.channel_id, "event.updated", EventOut, event)
     return
 
 
@@ -490,9 +1350,15 @@ async def delete_event(
 async def download_event_ics(
     event_id: str, user=Depends(get_current_user), db: AsyncSession = Depends(get_db)
 ):
-    result = await db.execute(select(Event).where(Event.id == event_id))
+    result = await db.execute(
+        select(Event)
+        .where(Event.id == event_id)
+        .options(selectinload(Event.exceptions))
+    )
     event = result.scalars().first()
-    if not event:
+    if not event or not await get_acl_cache().is_member(
+        db, user["sub"], event.channel_id
+    ):
         raise HTTPException(status_code=404, detail="Event not found")
 
     event_title = event.title
@@ -502,7 +1368,302 @@ async def download_event_ics(
     end_time = event.end_time
 
     ics_content = generate_ics(
-        event_title, event_description, event_location, start_time, end_time
+        event_title,
+        event_description,
+        event_location,
+        start_time,
+        end_time,
+        uid=event.id,
+        rrule=event.rrule,
+        exceptions=event.exceptions,
     )
     headers = {"Content-Disposition": "attachment; filename=event.ics"}
     return Response(content=ics_content, media_type="text/calendar", headers=headers)
+
+
+# ----------------------------
+# Behaviorist availability
+# ----------------------------
+
+
+class BusySlot(BaseModel):
+    start_time: datetime
+    end_time: datetime
+
+
+class AvailabilityOut(BaseModel):
+    behaviorist_id: str
+    busy: List[BusySlot]
+
+
+class ConflictOut(BaseModel):
+    first: EventOut
+    second: EventOut
+
+
+async def _behaviorist_occurrences(
+    db: AsyncSession, behaviorist_id: str, window_start: datetime, window_end: datetime
+) -> List[dict]:
+    """Occurrences in the window across all of the behaviorist's channels, by start."""
+    result = await db.execute(
+        select(Event)
+        .join(Channel, Event.channel_id == Channel.id)
+        .where(
+            Channel.behaviorist_id == behaviorist_id,
+            _overlapping(window_start, window_end),
+        )
+        .options(selectinload(Event.exceptions))
+    )
+    items = [
+        item
+        for event in result.scalars().all()
+        for item in _occurrence_items(event, window_start, window_end)
+    ]
+    items.sort(key=lambda item: (item["start_time"], item["id"]))
+    return items
+
+
+@router.get(
+    "/behaviorists/{behaviorist_id}/availability", response_model=AvailabilityOut
+)
+async def behaviorist_availability(
+    behaviorist_id: str,
+    window_start: datetime = Query(..., alias="from"),
+    window_end: datetime = Query(..., alias="to"),
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Busy time of a behaviorist, without event details.
+
+    Visible to the behaviorist and to members of any of their channels.
+    """
+    window_start, window_end = _check_window(window_start, window_end)
+    if behaviorist_id != user["sub"]:
+        result = await db.execute(
+            select(Channel.id)
+            .where(Channel.behaviorist_id == behaviorist_id, channel_member(user["sub"]))
+            .limit(1)
+        )
+        if result.scalar() is None:
+            raise HTTPException(status_code=404, detail="Behaviorist not found")
+
+    busy = []
+    for item in await _behaviorist_occurrences(
+        db, behaviorist_id, window_start, window_end
+    ):
+        if busy and item["start_time"] <= busy[-1]["end_time"]:
+            busy[-1]["end_time"] = max(busy[-1]["end_time"], item["end_time"])
+        else:
+            busy.append({"start_time": item["start_time"], "end_time": item["end_time"]})
+    return {"behaviorist_id": behaviorist_id, "busy": busy}
+
+
+@router.get(
+    "/behaviorists/{behaviorist_id}/conflicts", response_model=List[ConflictOut]
+)
+async def behaviorist_conflicts(
+    behaviorist_id: str,
+    window_start: datetime = Query(..., alias="from"),
+    window_end: datetime = Query(..., alias="to"),
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Pairs of overlapping occurrences in the behaviorist's own channels."""
+    window_start, window_end = _check_window(window_start, window_end)
+    if behaviorist_id != user["sub"]:
+        raise HTTPException(status_code=404, detail="Behaviorist not found")
+
+    conflicts = []
+    active: List[dict] = []
+    for item in await _behaviorist_occurrences(
+        db, behaviorist_id, window_start, window_end
+    ):
+        active = [other for other in active if other["end_time"] > item["start_time"]]
+        conflicts.extend({"first": other, "second": item} for other in active)
+        active.append(item)
+    return conflicts
+
+
+# ----------------------------
+# Calendar feeds
+# ----------------------------
+
+ICS_FEED_BATCH = int(os.getenv("ICS_FEED_BATCH", "200"))
+
+
+async def _stream_calendar(name: str, query):
+    dtstamp = format_datetime(datetime.utcnow())
+    yield calendar_begin(name)
+    # the request's session is closed before the body streams, so use our own
+    async with SessionLocal() as db:
+        result = await db.stream_scalars(
+            query.options(selectinload(Event.exceptions)).execution_options(
+                yield_per=ICS_FEED_BATCH
+            )
+        )
+        async for events in result.partitions():
+            yield "".join(render_event(event, dtstamp) for event in events)
+    yield calendar_end()
+
+
+def _calendar_response(name: str, query, etag: str) -> StreamingResponse:
+    return StreamingResponse(
+        _stream_calendar(name, query),
+        media_type="text/calendar; charset=utf-8",
+        headers={"ETag": etag, "Cache-Control": "private, no-cache"},
+    )
+
+
+class FeedTokenOut(BaseModel):
+    id: str
+    created_at: Optional[datetime]
+
+    class Config:
+        orm_mode = True
+
+
+class FeedTokenCreated(FeedTokenOut):
+    # shown once; calendar apps subscribe to the feed URLs with ?key=<token>
+    token: str
+
+
+@router.post("/calendar/feed_tokens", response_model=FeedTokenCreated)
+async def create_feed_token(
+    user=Depends(get_current_user), db: AsyncSession = Depends(get_db)
+):
+    token = new_feed_token()
+    feed_token = FeedToken(user_id=user["sub"], token_hash=hash_feed_token(token))
+    db.add(feed_token)
+    await db.commit()
+    await db.refresh(feed_token)
+    return {"id": feed_token.id, "created_at": feed_token.created_at, "token": token}
+
+
+@router.get("/calendar/feed_tokens", response_model=List[FeedTokenOut])
+async def list_feed_tokens(
+    user=Depends(get_current_user), db: AsyncSession = Depends(get_db)
+):
+    result = await db.execute(
+        select(FeedToken)
+        .where(FeedToken.user_id == user["sub"])
+        .order_by(FeedToken.created_at)
+    )
+    return result.scalars().all()
+
+
+@router.delete("/calendar/feed_tokens/{token_id}", status_code=204)
+async def revoke_feed_token(
+    token_id: str, user=Depends(get_current_user), db: AsyncSession = Depends(get_db)
+):
+    result = await db.execute(
+        delete(FeedToken)
+        .where(FeedToken.id == token_id, FeedToken.user_id == user["sub"])
+        .returning(FeedToken.id)
+    )
+    if result.scalar() is None:
+        raise HTTPException(status_code=404, detail="Feed token not found")
+    await db.commit()
+    return
+
+
+@router.get("/channels/{channel_id}/calendar.ics")
+async def channel_calendar(
+    channel_id: str,
+    if_none_match: Optional[str] = Header(None),
+    user=Depends(get_feed_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Subscribable iCalendar feed of all events in a channel."""
+    result = await db.execute(
+        select(Channel.name, Channel.version).where(
+            accessible_channel(channel_id, user["sub"])
+        )
+    )
+    channel = result.first()
+    if channel is None:
+        raise HTTPException(status_code=404, detail="Channel not found")
+    etag = weak_etag("calendar", channel_id, channel.version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    query = (
+        select(Event).where(Event.channel_id == channel_id).order_by(Event.start_time)
+    )
+    return _calendar_response(channel.name, query, etag)
+
+
+@router.get("/calendar.ics")
+async def user_calendar(
+    if_none_match: Optional[str] = Header(None),
+    user=Depends(get_feed_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Subscribable iCalendar feed of the events in all of the user's channels."""
+    result = await db.execute(
+        select(Channel.id, Channel.version)
+        .where(channel_member(user["sub"]))
+        .order_by(Channel.id)
+    )
+    channels = result.all()
+    # changes whenever a channel is joined, left, deleted or written to
+    etag = weak_etag(
+        "calendar", user["sub"], *(f"{row.id}:{row.version}" for row in channels)
+    )
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    query = select(Event).where(Event.channel_id.in_([row.id for row in channels]))
+    return _calendar_response("Paw Connect", query, etag)
+
+
+# ----------------------------
+# Delta sync
+# ----------------------------
+
+
+class DeletedOut(BaseModel):
+    entity_type: str
+    entity_id: str
+    deleted_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class ChangesOut(BaseModel):
+    posts: List[PostOut] = []
+    comments: List[CommentOut] = []
+    media: List[MediaOut] = []
+    events: List[EventOut] = []
+    deleted: List[DeletedOut] = []
+    version: int
+    next_cursor: str
+    has_more: bool = False
+
+
+@router.get("/channels/{channel_id}/changes", response_model=ChangesOut)
+async def channel_changes(
+    channel_id: str,
+    since: Optional[str] = Query(None),
+    limit: int = Query(SYNC_PAGE_SIZE, ge=1, le=SYNC_MAX_PAGE_SIZE),
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Rows created, updated or deleted since `since`; everything without it.
+
+    Rows committed while a delta is read may show up again in the next one,
+    so clients upsert by id. Pass `next_cursor` as `since` on the next call,
+    and keep calling while `has_more` is set.
+    """
+    cursor = decode_sync_cursor(since) if since else None
+    result = await db.execute(
+        select(Channel.version).where(accessible_channel(channel_id, user["sub"]))
+    )
+    version = result.scalar()
+    if version is None:
+        if cursor is not None and await channel_deleted(db, channel_id, user["sub"]):
+            raise HTTPException(status_code=410, detail="Channel deleted")
+        raise HTTPException(status_code=404, detail="Channel not found")
+
+    if cursor == version:
+        return {"version": version, "next_cursor": since}
+    changes = await load_changes(db, channel_id, cursor, version, limit)
+    return {**changes, "version": version}
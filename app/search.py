@@ -0,0 +1,151 @@
+import os
+from typing import List, Optional
+
+# aliases; the concrete indices behind them are versioned so they can be rebuilt
+POSTS_INDEX = os.getenv("ES_POSTS_INDEX", "channels-posts")
+COMMENTS_INDEX = os.getenv("ES_COMMENTS_INDEX", "channels-comments")
+EVENTS_INDEX = os.getenv("ES_EVENTS_INDEX", "channels-events")
+
+SEARCH_MAX_WINDOW = 1000
+
+_keyword = {"type": "keyword"}
+_text = {"type": "text"}
+_date = {"type": "date"}
+
+MAPPINGS = {
+    POSTS_INDEX: {
+        "dynamic": False,
+        "properties": {
+            "kind": _keyword,
+            "channel_id": _keyword,
+            "title": _text,
+            "content": _text,
+            "author_id": _keyword,
+            "created_at": _date,
+            "updated_at": _date,
+        },
+    },
+    COMMENTS_INDEX: {
+        "dynamic": False,
+        "properties": {
+            "kind": _keyword,
+            "channel_id": _keyword,
+            "post_id": _keyword,
+            "content": _text,
+            "author_id": _keyword,
+            "created_at": _date,
+        },
+    },
+    EVENTS_INDEX: {
+        "dynamic": False,
+        "properties": {
+            "kind": _keyword,
+            "channel_id": _keyword,
+            "title": _text,
+            "description": _text,
+            "location": _text,
+            "start_time": _date,
+            "end_time": _date,
+            "created_by": _keyword,
+            "created_at": _date,
+            "updated_at": _date,
+        },
+    },
+}
+
+INDEX_BY_KIND = {"post": POSTS_INDEX, "comment": COMMENTS_INDEX, "event": EVENTS_INDEX}
+SEARCH_FIELDS = ["title^2", "content", "description", "location"]
+HIGHLIGHT_FIELDS = {"title": {}, "content": {}, "description": {}, "location": {}}
+
+
+async def ensure_indices(es):
+    for alias, mapping in MAPPINGS.items():
+        if not await es.indices.exists(index=alias):
+            await es.indices.create(
+                index=f"{alias}-v1", mappings=mapping, aliases={alias: {}}
+            )
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def post_document(post) -> dict:
+    return {
+        "kind": "post",
+        "channel_id": post.channel_id,
+        "title": post.title,
+        "content": post.content,
+        "author_id": post.author_id,
+        "created_at": _isoformat(post.created_at),
+        "updated_at": _isoformat(post.updated_at),
+    }
+
+
+def comment_document(comment, channel_id: str) -> dict:
+    return {
+        "kind": "comment",
+        "channel_id": channel_id,
+        "post_id": comment.post_id,
+        "content": comment.content,
+        "author_id": comment.author_id,
+        "created_at": _isoformat(comment.created_at),
+    }
+
+
+def event_document(event) -> dict:
+    return {
+        "kind": "event",
+        "channel_id": event.channel_id,
+        "title": event.title,
+        "description": event.description,
+        "location": event.location,
+        "start_time": _isoformat(event.start_time),
+        "end_time": _isoformat(event.end_time),
+        "created_by": event.created_by,
+        "created_at": _isoformat(event.created_at),
+        "updated_at": _isoformat(event.updated_at),
+    }
+
+
+async def search_documents(
+    es,
+    query: str,
+    channel_ids: List[str],
+    kinds: Optional[List[str]] = None,
+    offset: int = 0,
+    limit: int = 20,
+) -> dict:
+    """Full-text search restricted to `channel_ids`, with highlighted fragments."""
+    if not channel_ids:
+        return {"items": [], "total": 0, "next_offset": None}
+    indices = [INDEX_BY_KIND[kind] for kind in (kinds or INDEX_BY_KIND)]
+    response = await es.search(
+        index=",".join(indices),
+        query={
+            "bool": {
+                "must": {"multi_match": {"query": query, "fields": SEARCH_FIELDS}},
+                "filter": [{"terms": {"channel_id": channel_ids}}],
+            }
+        },
+        highlight={"fields": HIGHLIGHT_FIELDS},
+        from_=offset,
+        size=limit,
+        track_total_hits=SEARCH_MAX_WINDOW,
+    )
+    hits = response["hits"]
+    items = [
+        {
+            "kind": hit["_source"].get("kind"),
+            "id": hit["_id"],
+            "channel_id": hit["_source"].get("channel_id"),
+            "score": hit["_score"],
+            "highlight": hit.get("highlight", {}),
+            "document": hit["_source"],
+        }
+        for hit in hits["hits"]
+    ]
+    next_offset = offset + limit
+    if next_offset >= min(hits["total"]["value"], SEARCH_MAX_WINDOW):
+        next_offset = None
+    return {"items": items, "total": hits["total"]["value"], "next_offset": next_offset}
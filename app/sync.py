@@ -0,0 +1,136 @@
+import base64
+import binascii
+import json
+import os
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models import Comment, Event, Media, Post, Tombstone
+
+SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", "500"))
+SYNC_MAX_PAGE_SIZE = int(os.getenv("SYNC_MAX_PAGE_SIZE", "2000"))
+
+
+def encode_sync_cursor(version: int) -> str:
+    raw = json.dumps({"version": version}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_sync_cursor(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return int(json.loads(raw)["version"])
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def record_deletion(
+    db: AsyncSession,
+    channel_id: str,
+    entity_type: str,
+    entity_id: str,
+    member_ids: Optional[list] = None,
+):
+    db.add(
+        Tombstone(
+            channel_id=channel_id,
+            entity_type=entity_type,
+            entity_id=entity_id,
+            member_ids=member_ids,
+        )
+    )
+
+
+def _sources(channel_id: str, since: Optional[int]) -> dict:
+    """Per response key, the model and a query of the channel's rows for it."""
+    in_channel = Post.channel_id == channel_id
+    sources = {
+        "posts": (Post, lambda column: select(column).where(in_channel)),
+        "comments": (
+            Comment,
+            lambda column: select(column)
+            .join(Post, Comment.post_id == Post.id)
+            .where(in_channel),
+        ),
+        "media": (
+            Media,
+            lambda column: select(column)
+            .join(Post, Media.post_id == Post.id)
+            .where(in_channel),
+        ),
+        "events": (
+            Event,
+            lambda column: select(column).where(Event.channel_id == channel_id),
+        ),
+    }
+    if since is not None:
+        sources["deleted"] = (
+            Tombstone,
+            lambda column: select(column).where(Tombstone.channel_id == channel_id),
+        )
+    return sources
+
+
+async def load_changes(
+    db: AsyncSession,
+    channel_id: str,
+    since: Optional[int],
+    version: int,
+    limit: int = SYNC_PAGE_SIZE,
+):
+    """A page of rows written or deleted after version `since` (all if None).
+
+    Rows carry the channel version their write produced, and versions are
+    handed out in commit order, so nothing committed at or below a version
+    the caller has seen can show up later. Pages therefore end on a version:
+    the lowest one at which some kind of row reaches `limit`, capped at the
+    channel's current `version`, with every row at or below it included.
+    """
+    sources = _sources(channel_id, since)
+
+    def changed(model):
+        if since is None:
+            return []
+        return [model.channel_version > since]
+
+    until = version
+    for model, query in sources.values():
+        result = await db.execute(
+            query(model.channel_version)
+            .where(*changed(model))
+            .order_by(model.channel_version)
+            .offset(limit - 1)
+            .limit(1)
+        )
+        page_end = result.scalar()
+        if page_end is not None and page_end < until:
+            until = page_end
+
+    changes = {}
+    for key, (model, query) in sources.items():
+        result = await db.execute(
+            query(model)
+            .where(*changed(model), model.channel_version <= until)
+            .order_by(model.channel_version)
+        )
+        changes[key] = result.scalars().all()
+    return {
+        **changes,
+        "has_more": until < version,
+        "next_cursor": encode_sync_cursor(until),
+    }
+
+
+async def channel_deleted(db: AsyncSession, channel_id: str, user_sub: str) -> bool:
+    """Whether `user_sub` belonged to `channel_id` when it was deleted."""
+    result = await db.execute(
+        select(Tombstone.id).where(
+            Tombstone.channel_id == channel_id,
+            Tombstone.entity_type == "channel",
+            Tombstone.member_ids.any(user_sub),
+        )
+    )
+    return result.first() is not None
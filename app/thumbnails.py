@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import mimetypes
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from prometheus_client import Counter, Histogram
+from sqlalchemy import update
+from sqlalchemy.future import select
+
+from app.db import SessionLocal
+from app.imaging import VARIANT_EXTENSION, render_variants
+from app.minio import download_file, remove_object, upload_file
+from app.models import Media, MediaObject
+
+# longest edge, in pixels, of each resized variant
+MEDIA_VARIANT_SIZES = [
+    int(size) for size in os.getenv("MEDIA_VARIANT_SIZES", "320,1280").split(",") if size
+]
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "2"))
+
+logger = logging.getLogger(__name__)
+
+media_variants_processed = Counter(
+    "media_variants_processed_total", "Media processed for variants", ["result"]
+)
+media_variants_seconds = Histogram(
+    "media_variants_seconds", "Time to render and store the variants of one media"
+)
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_thumbnail_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn, not fork: the server process has threads and open sockets
+        _pool = ProcessPoolExecutor(
+            max_workers=THUMBNAIL_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_thumbnail_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def media_kind(object_name: str, content_type: Optional[str] = None) -> Optional[str]:
+    # content-addressed keys have no extension; their type is on media_objects
+    if content_type is None:
+        content_type, _ = mimetypes.guess_type(object_name)
+    if content_type is None:
+        return None
+    kind = content_type.split("/", 1)[0]
+    return kind if kind in ("image", "video") else None
+
+
+def variant_prefix(object_name: str) -> str:
+    # derived from the object key, so media sharing an object share its variants
+    return f"variants/{object_name}/"
+
+
+def variant_key(object_name: str, name: str) -> str:
+    return f"{variant_prefix(object_name)}{name}.{VARIANT_EXTENSION}"
+
+
+async def generate_variants(object_name: str, kind: str) -> Dict[str, str]:
+    """Render and store the variants of an object; returns name -> object key."""
+    loop = asyncio.get_running_loop()
+    keys: Dict[str, str] = {}
+    with tempfile.TemporaryDirectory(prefix="media-") as workdir:
+        source = os.path.join(workdir, "original")
+        await download_file(object_name, source)
+        rendered = await loop.run_in_executor(
+            get_thumbnail_pool(),
+            render_variants,
+            source,
+            kind,
+            MEDIA_VARIANT_SIZES,
+            workdir,
+        )
+        for name, path in rendered.items():
+            key = variant_key(object_name, name)
+            await upload_file(key, path, content_type="image/jpeg")
+            keys[name] = key
+    return keys
+
+
+async def process_media(media_id: str) -> Optional[Media]:
+    """Generate variants for a media row; returns the updated row, if any."""
+    started = time.perf_counter()
+    # no connection is held while rendering, which can take seconds
+    async with SessionLocal() as db:
+        result = await db.execute(
+            select(Media.file_path, MediaObject.content_type)
+            .outerjoin(MediaObject, MediaObject.key == Media.file_path)
+            .where(Media.id == media_id)
+        )
+        row = result.first()
+        if row is None:
+            media_variants_processed.labels("skipped").inc()
+            return None
+        object_name = row.file_path
+        # a repeat upload of stored content reuses the variants already made
+        result = await db.execute(
+            select(Media.variants)
+            .where(
+                Media.file_path == object_name,
+                Media.id != media_id,
+                Media.variants.is_not(None),
+            )
+            .limit(1)
+        )
+        variants = result.scalar()
+    if variants is None:
+        kind = media_kind(object_name, row.content_type)
+        if kind is None:
+            media_variants_processed.labels("skipped").inc()
+            return None
+        try:
+            variants = await generate_variants(object_name, kind)
+        except Exception:
+            logger.warning("Media variant generation failed", exc_info=True)
+            media_variants_processed.labels("failed").inc()
+            return None
+        if not variants:
+            media_variants_processed.labels("skipped").inc()
+            return None
+
+    async with SessionLocal() as db:
+        result = await db.execute(
+            update(Media)
+            .where(Media.id == media_id)
+            .values(variants=variants)
+            .returning(Media)
+        )
+        media = result.scalars().first()
+        await db.commit()
+        if media is None:
+            # deleted while we worked; the variants are orphaned unless
+            # other media still reference the same object
+            result = await db.execute(
+                select(MediaObject.ref_count).where(MediaObject.key == object_name)
+            )
+            shared = (result.scalar() or 0) > 0
+    if media is None:
+        if not shared:
+            for key in variants.values():
+                await remove_object(key)
+        media_variants_processed.labels("skipped").inc()
+        return None
+    media_variants_processed.labels("ok").inc()
+    media_variants_seconds.observe(time.perf_counter() - started)
+    return media
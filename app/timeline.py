@@ -0,0 +1,52 @@
+import os
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import aliased
+
+TIMELINE_COMMENTS = int(os.getenv("TIMELINE_COMMENTS", "3"))
+TIMELINE_MAX_COMMENTS = int(os.getenv("TIMELINE_MAX_COMMENTS", "20"))
+TIMELINE_MEDIA = int(os.getenv("TIMELINE_MEDIA", "10"))
+TIMELINE_MAX_MEDIA = int(os.getenv("TIMELINE_MAX_MEDIA", "50"))
+
+
+async def latest_per_post(
+    db: AsyncSession, model, post_ids: List[str], limit: int
+) -> Dict[str, Tuple[list, int]]:
+    """The newest `limit` rows of `model` for each post, with the post's total.
+
+    One query for all posts: rows are ranked and counted per post in a window,
+    so the cap applies per post rather than to the whole result.
+    """
+    if not post_ids:
+        return {}
+    ranked = (
+        select(
+            model,
+            func.row_number()
+            .over(
+                partition_by=model.post_id,
+                order_by=(model.created_at.desc(), model.id.desc()),
+            )
+            .label("rank"),
+            func.count().over(partition_by=model.post_id).label("total"),
+        )
+        .where(model.post_id.in_(post_ids))
+        .subquery()
+    )
+    row = aliased(model, ranked)
+    result = await db.execute(
+        select(row, ranked.c.total)
+        .where(ranked.c.rank <= max(limit, 1))
+        .order_by(ranked.c.post_id, ranked.c.rank)
+    )
+    latest = defaultdict(lambda: ([], 0))
+    for item, total in result.all():
+        items, _ = latest[item.post_id]
+        if limit:
+            items.append(item)
+        latest[item.post_id] = (items, total)
+    return dict(latest)
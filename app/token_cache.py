@@ -0,0 +1,65 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from prometheus_client import Counter
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+token_cache_hits = Counter(
+    "auth_token_cache_hits_total", "Verified JWT claims served from cache"
+)
+token_cache_misses = Counter(
+    "auth_token_cache_misses_total", "JWTs that required full signature verification"
+)
+
+
+class TokenCache:
+    """Bounded LRU of decoded claims, each entry expiring at the token's `exp`."""
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # shared by the event loop and threadpool workers
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self.key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                token_cache_misses.inc()
+                return None
+            expires_at, claims = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                token_cache_misses.inc()
+                return None
+            self._entries.move_to_end(key)
+        token_cache_hits.inc()
+        return claims
+
+    def set(self, token: str, claims: dict):
+        exp = claims.get("exp")
+        if not isinstance(exp, (int, float)) or self.maxsize <= 0:
+            return
+        key = self.key(token)
+        with self._lock:
+            self._entries[key] = (exp, claims)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
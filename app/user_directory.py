@@ -0,0 +1,102 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from app.keycloak_api import keycloak_admin
+
+USER_DIRECTORY_CACHE_TTL = float(os.getenv("USER_DIRECTORY_CACHE_TTL", "300"))
+USER_DIRECTORY_NEGATIVE_TTL = float(os.getenv("USER_DIRECTORY_NEGATIVE_TTL", "30"))
+USER_DIRECTORY_CACHE_SIZE = int(os.getenv("USER_DIRECTORY_CACHE_SIZE", "10000"))
+KEYCLOAK_LOOKUP_WORKERS = int(os.getenv("KEYCLOAK_LOOKUP_WORKERS", "4"))
+
+
+class KeycloakDirectoryBackend:
+    """Runs the blocking KeycloakAdmin client on a small dedicated thread pool."""
+
+    def __init__(self, admin=keycloak_admin, max_workers: int = KEYCLOAK_LOOKUP_WORKERS):
+        self.admin = admin
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="keycloak"
+        )
+
+    def _find_user_id(self, email: str) -> Optional[str]:
+        users = self.admin.get_users({"email": email})
+        if len(users) > 0:
+            return users[0].get("id")
+        return None
+
+    async def find_user_id(self, email: str) -> Optional[str]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._find_user_id, email)
+
+
+class FakeDirectoryBackend:
+    """In-memory backend for running without Keycloak."""
+
+    def __init__(self, users: Optional[Dict[str, str]] = None):
+        self.users = {k.lower(): v for k, v in (users or {}).items()}
+        self.lookups = 0
+
+    async def find_user_id(self, email: str) -> Optional[str]:
+        self.lookups += 1
+        return self.users.get(email.lower())
+
+
+class UserDirectory:
+    """email -> user id lookups with a TTL cache and in-flight request merging."""
+
+    def __init__(
+        self,
+        backend,
+        ttl: float = USER_DIRECTORY_CACHE_TTL,
+        negative_ttl: float = USER_DIRECTORY_NEGATIVE_TTL,
+        maxsize: int = USER_DIRECTORY_CACHE_SIZE,
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.maxsize = maxsize
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def get_user_id(self, email: str) -> Optional[str]:
+        key = email.strip().lower()
+        entry = self._cache.get(key)
+        if entry is not None:
+            expires_at, user_id = entry
+            if expires_at > time.monotonic():
+                self._cache.move_to_end(key)
+                return user_id
+            del self._cache[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._lookup(key, email))
+            self._inflight[key] = task
+        # a cancelled caller must not cancel the lookup other callers wait on
+        return await asyncio.shield(task)
+
+    async def _lookup(self, key: str, email: str) -> Optional[str]:
+        try:
+            user_id = await self.backend.find_user_id(email)
+        finally:
+            self._inflight.pop(key, None)
+        ttl = self.ttl if user_id is not None else self.negative_ttl
+        self._cache[key] = (time.monotonic() + ttl, user_id)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return user_id
+
+    def invalidate(self, email: str):
+        self._cache.pop(email.strip().lower(), None)
+
+
+user_directory = UserDirectory(KeycloakDirectoryBackend())
+
+
+def get_user_directory():
+    return user_directory
@@ -0,0 +1,79 @@
+"""Measure channel feed fan-out latency with many local subscribers.
+
+    python scripts/ws_fanout_bench.py --subscribers 5000 --messages 200
+
+Subscribers are in-process consumers of the same Hub the websocket endpoint
+uses, so the numbers cover queueing and scheduling, not the network.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.realtime import Hub  # noqa: E402
+
+
+async def consume(subscription, count: int, latencies: list, send_delay: float):
+    for _ in range(count):
+        message = await subscription.queue.get()
+        latencies.append(time.perf_counter() - message["sent_at"])
+        if send_delay:
+            await asyncio.sleep(send_delay)
+        if subscription.dropped:
+            return
+
+
+async def run(args):
+    hub = Hub(queue_size=args.queue_size)
+    latencies: list = []
+    subscriptions = []
+    consumers = []
+    for index in range(args.subscribers):
+        subscription = hub.subscribe("bench")
+        subscriptions.append(subscription)
+        # every `slow_every`-th subscriber lags behind to exercise dropping
+        slow = args.slow_every and index % args.slow_every == 0
+        delay = args.slow_delay if slow else 0
+        consumers.append(
+            asyncio.create_task(consume(subscription, args.messages, latencies, delay))
+        )
+
+    started = time.perf_counter()
+    for sequence in range(args.messages):
+        hub.publish("bench", {"sequence": sequence, "sent_at": time.perf_counter()})
+        await asyncio.sleep(args.interval)
+    await asyncio.wait(consumers, timeout=args.timeout)
+    elapsed = time.perf_counter() - started
+    for task in consumers:
+        task.cancel()
+
+    latencies.sort()
+    print(f"subscribers: {args.subscribers}, messages: {args.messages}")
+    print(f"deliveries: {len(latencies)} in {elapsed:.2f}s")
+    if latencies:
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(
+            f"latency ms: p50={statistics.median(latencies) * 1000:.2f} "
+            f"p99={p99 * 1000:.2f} max={latencies[-1] * 1000:.2f}"
+        )
+    print(f"dropped: {sum(1 for s in subscriptions if s.dropped)}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.005)
+    parser.add_argument("--queue-size", type=int, default=100)
+    parser.add_argument("--slow-every", type=int, default=0)
+    parser.add_argument("--slow-delay", type=float, default=0.05)
+    parser.add_argument("--timeout", type=float, default=60)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
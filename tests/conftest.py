@@ -0,0 +1,130 @@
+import os
+import uuid
+from contextlib import contextmanager
+from functools import partial
+
+import pytest
+from anyio.from_thread import start_blocking_portal
+from sqlalchemy import delete, event
+
+# Database tests run against TEST_DATABASE_URL, migrated with `alembic upgrade
+# head`, and are skipped without it.
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    # app.db builds its engine from DATABASE_URL at import
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+
+
+@pytest.fixture(scope="session")
+def portal():
+    """One event loop for the whole run; pooled connections are bound to it."""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from app.db import engine
+
+    with start_blocking_portal() as portal:
+        yield portal
+        portal.call(engine.dispose)
+
+
+class Client:
+    """Synchronous facade over an in-process httpx client running on `portal`."""
+
+    def __init__(self, portal, app):
+        import httpx
+
+        self.portal = portal
+        self._client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        )
+
+    def request(self, method: str, url: str, **kwargs):
+        return self.portal.call(partial(self._client.request, method, url, **kwargs))
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def delete(self, url: str, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+
+@pytest.fixture(scope="session")
+def current_user():
+    """The claims every request authenticates as; tests may change `sub`."""
+    return {"sub": "behaviorist-1"}
+
+
+@pytest.fixture(scope="session")
+def client(portal, current_user):
+    from fastapi import FastAPI
+
+    from app import routers
+    from app.auth import get_current_user
+
+    # the API router alone: the real app's lifespan needs Elasticsearch and MinIO
+    app = FastAPI()
+    app.include_router(routers.router)
+    app.dependency_overrides[get_current_user] = lambda: current_user
+    return Client(portal, app)
+
+
+@pytest.fixture
+def channel(portal, current_user):
+    """A channel owned by the current user, deleted with its children afterwards."""
+    from app.db import SessionLocal
+    from app.models import Channel
+
+    channel_id = str(uuid.uuid4())
+
+    async def create():
+        async with SessionLocal() as db:
+            db.add(
+                Channel(
+                    id=channel_id,
+                    name="Test channel",
+                    behaviorist_id=current_user["sub"],
+                    client_id="client-1",
+                )
+            )
+            await db.commit()
+
+    async def drop():
+        async with SessionLocal() as db:
+            await db.execute(delete(Channel).where(Channel.id == channel_id))
+            await db.commit()
+
+    portal.call(create)
+    yield channel_id
+    portal.call(drop)
+
+
+@pytest.fixture
+def count_queries(portal):
+    """Context manager collecting the SQL statements sent while it is open.
+
+        with count_queries() as queries:
+            client.get(...)
+        assert len(queries) == 1
+    """
+    from app.db import engine
+
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+    return counter
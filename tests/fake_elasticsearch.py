@@ -0,0 +1,125 @@
+"""An in-memory stand-in for the parts of the Elasticsearch client the app uses.
+
+Documents are stored per index name; aliases are not modelled, so the app's
+alias names are used as index names. Like the real cluster, searches only see
+documents as of the last refresh.
+"""
+import copy
+import re
+
+
+def _tokens(value) -> set:
+    return set(re.findall(r"\w+", str(value).lower())) if value is not None else set()
+
+
+def _matches(source: dict, query: dict) -> bool:
+    (kind, clause), = query.items()
+    if kind == "bool":
+        must = clause.get("must", [])
+        must = must if isinstance(must, list) else [must]
+        return all(_matches(source, part) for part in must + clause.get("filter", []))
+    if kind == "term":
+        (field, value), = clause.items()
+        return source.get(field) == value
+    if kind == "terms":
+        (field, values), = clause.items()
+        return source.get(field) in values
+    if kind == "multi_match":
+        fields = [field.split("^")[0] for field in clause["fields"]]
+        return any(_tokens(clause["query"]) & _tokens(source.get(f)) for f in fields)
+    raise NotImplementedError(kind)
+
+
+def _highlight(value: str, terms: set) -> str:
+    def mark(match):
+        word = match.group(0)
+        return f"<em>{word}</em>" if word.lower() in terms else word
+
+    return re.sub(r"\w+", mark, value)
+
+
+class FakeIndices:
+    def __init__(self, es):
+        self.es = es
+
+    async def refresh(self, index=None):
+        for name in self.es._names(index):
+            self.es.visible[name] = copy.deepcopy(self.es.documents.get(name, {}))
+
+
+class FakeElasticsearch:
+    def __init__(self):
+        # index -> id -> (version, source); `visible` is the last refresh
+        self.documents = {}
+        self.visible = {}
+        self.indices = FakeIndices(self)
+
+    def _names(self, index):
+        if index is None:
+            return list(self.documents)
+        return [name for name in index.split(",") if name]
+
+    def write(self, index: str, doc_id: str, source: dict, version: int = 0):
+        self.documents.setdefault(index, {})[doc_id] = (version, source)
+
+    def bulk_item(self, action: dict) -> dict:
+        """Apply one bulk action, with external versioning; returns its result."""
+        op_type = action.get("_op_type", "index")
+        index, doc_id = action["_index"], action["_id"]
+        documents = self.documents.setdefault(index, {})
+        current = documents.get(doc_id)
+        item = {"_index": index, "_id": doc_id, "status": 200}
+        if current is not None and action.get("version", 0) <= current[0]:
+            item["status"] = 409
+        elif op_type == "delete":
+            if current is None:
+                item["status"] = 404
+            else:
+                del documents[doc_id]
+        else:
+            documents[doc_id] = (action.get("version", 0), action["_source"])
+        return {op_type: item}
+
+    async def search(
+        self, index, query, highlight=None, from_=0, size=10, track_total_hits=10000
+    ):
+        hits = []
+        terms = _tokens(query["bool"]["must"]["multi_match"]["query"])
+        for name in self._names(index):
+            for doc_id, (_, source) in sorted(self.visible.get(name, {}).items()):
+                if not _matches(source, query):
+                    continue
+                hit = {"_index": name, "_id": doc_id, "_score": 1.0, "_source": source}
+                fragments = {}
+                for field in (highlight or {}).get("fields", {}):
+                    if terms & _tokens(source.get(field)):
+                        fragments[field] = [_highlight(source[field], terms)]
+                if fragments:
+                    hit["highlight"] = fragments
+                hits.append(hit)
+        return {
+            "hits": {
+                "total": {"value": min(len(hits), track_total_hits)},
+                "hits": hits[from_ : from_ + size],
+            }
+        }
+
+    async def delete_by_query(self, index, query, conflicts=None):
+        deleted = 0
+        for name in self._names(index):
+            documents = self.documents.get(name, {})
+            for doc_id, (_, source) in self.visible.get(name, {}).items():
+                if _matches(source, query) and documents.pop(doc_id, None):
+                    deleted += 1
+        return {"deleted": deleted}
+
+
+async def async_bulk(client, actions, **kwargs):
+    """Stands in for elasticsearch.helpers.async_bulk with raise_on_error=False."""
+    errors = []
+    for action in actions:
+        item = client.bulk_item(action)
+        (result,) = item.values()
+        if result["status"] >= 300:
+            errors.append(item)
+    return len(actions) - len(errors), errors
@@ -0,0 +1,91 @@
+import asyncio
+import json
+import os
+import time
+
+import pytest
+from fastapi import HTTPException
+from jose import jwk, jwt
+
+from app import auth, jwks
+from app.token_cache import token_cache
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+JWKS_PATH = os.path.join(FIXTURES, "jwks.json")
+
+with open(os.path.join(FIXTURES, "jwks_private.pem")) as f:
+    PRIVATE_KEY = f.read()
+
+
+def make_token(kid="test-key-1", sub="user-1"):
+    claims = {"sub": sub, "exp": int(time.time()) + 300}
+    return jwt.encode(claims, PRIVATE_KEY, algorithm="RS256", headers={"kid": kid})
+
+
+@pytest.fixture(autouse=True)
+def jwks_file(monkeypatch):
+    monkeypatch.setattr(jwks, "KEYCLOAK_JWKS_PATH", JWKS_PATH)
+    monkeypatch.setattr(jwks, "KEYCLOAK_JWKS_URL", "")
+    monkeypatch.setattr(jwks, "_refresh_attempted_at", None)
+    jwks.key_store.load({"keys": []})
+    token_cache.clear()
+    yield
+    jwks.key_store.load({"keys": []})
+    token_cache.clear()
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    calls = []
+    fetch_jwks = jwks.fetch_jwks
+
+    async def counting_fetch():
+        calls.append(time.monotonic())
+        return await fetch_jwks()
+
+    monkeypatch.setattr(jwks, "fetch_jwks", counting_fetch)
+    return calls
+
+
+def verify(token):
+    return asyncio.run(auth.verify_token(token))
+
+
+def test_verifies_with_key_from_jwks_file():
+    asyncio.run(jwks.refresh_jwks())
+    assert verify(make_token())["sub"] == "user-1"
+
+
+def test_unknown_kid_refreshes_the_key_store(fetches):
+    # e.g. Keycloak rotated before the periodic refresh ran
+    assert len(jwks.key_store) == 0
+    assert verify(make_token())["sub"] == "user-1"
+    assert len(fetches) == 1
+
+
+def test_unknown_kid_refresh_is_rate_limited(fetches):
+    with pytest.raises(HTTPException) as excinfo:
+        verify(make_token(kid="made-up-1"))
+    assert excinfo.value.status_code == 401
+    with pytest.raises(HTTPException):
+        verify(make_token(kid="made-up-2"))
+    assert len(fetches) == 1
+
+
+@pytest.fixture
+def static_key(monkeypatch):
+    with open(JWKS_PATH) as f:
+        key_data = json.load(f)["keys"][0]
+    monkeypatch.setattr(auth, "public_key", jwk.construct(key_data, "RS256"))
+
+
+def test_static_key_is_not_used_when_jwks_is_configured(static_key):
+    asyncio.run(jwks.refresh_jwks())
+    with pytest.raises(HTTPException) as excinfo:
+        verify(make_token(kid=None))
+    assert excinfo.value.status_code == 401
+
+
+def test_static_key_is_used_without_jwks(static_key, monkeypatch):
+    monkeypatch.setattr(jwks, "KEYCLOAK_JWKS_PATH", "")
+    assert verify(make_token(kid=None))["sub"] == "user-1"
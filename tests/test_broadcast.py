@@ -0,0 +1,54 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from app.broadcast import PostgresBroadcast, ReplayBuffer, _payloads, get_broadcast
+from app.realtime import Hub
+
+
+@pytest.mark.skipif(
+    "BROADCAST_BACKEND" in os.environ, reason="BROADCAST_BACKEND is set explicitly"
+)
+def test_backend_defaults_to_postgres():
+    # DATABASE_URL is always a Postgres URL here
+    assert isinstance(get_broadcast(), PostgresBroadcast)
+
+
+def test_failed_notify_is_not_delivered_twice():
+    hub = Hub()
+    subscription = hub.subscribe("c1")
+    backend = PostgresBroadcast(hub, ReplayBuffer(), dsn="postgresql://unused")
+    messages = [backend.stamp({"type": "post.created", "data": {"id": "p1"}})]
+
+    # no connection: delivered locally, then the listener sees it after all
+    asyncio.run(backend._notify("c1", messages))
+    for payload in _payloads("c1", messages):
+        backend._on_notify(None, 0, "channel_events", payload)
+
+    assert subscription.queue.qsize() == 1
+    assert subscription.queue.get_nowait()["id"] == messages[0]["id"]
+
+
+def test_replay_resumes_after_last_seen_id():
+    replay = ReplayBuffer(size=3)
+    for number in range(4):
+        assert replay.add("c1", {"id": str(number)})
+    assert not replay.add("c1", {"id": "3"})
+    assert [message["id"] for message in replay.since("c1", "1")] == ["2", "3"]
+    # fell out of the buffer
+    assert replay.since("c1", "0") is None
+
+
+def test_payloads_respect_the_notify_limit():
+    messages = [
+        {"id": str(number), "type": "t", "data": {"text": "x" * 3000}}
+        for number in range(5)
+    ]
+    payloads = _payloads("c1", messages)
+    assert len(payloads) > 1
+    delivered = [
+        message["id"] for payload in payloads for message in json.loads(payload)["messages"]
+    ]
+    assert delivered == [message["id"] for message in messages]
@@ -0,0 +1,21 @@
+def test_feed_key_is_revocable(client, channel):
+    created = client.post("/api/channels/calendar/feed_tokens")
+    assert created.status_code == 200, created.text
+    token = created.json()
+    assert [t["id"] for t in client.get("/api/channels/calendar/feed_tokens").json()] == [
+        token["id"]
+    ]
+
+    feed = client.get("/api/channels/calendar.ics", params={"key": token["token"]})
+    assert feed.status_code == 200, feed.text
+    assert feed.text.startswith("BEGIN:VCALENDAR")
+
+    revoked = client.delete(f"/api/channels/calendar/feed_tokens/{token['id']}")
+    assert revoked.status_code == 204
+    feed = client.get("/api/channels/calendar.ics", params={"key": token["token"]})
+    assert feed.status_code == 401
+
+
+def test_unknown_feed_key(client):
+    response = client.get("/api/channels/calendar.ics", params={"key": "nope"})
+    assert response.status_code == 401
@@ -0,0 +1,128 @@
+WEEKLY = {
+    "title": "Walk",
+    "start_time": "2026-11-02T10:00:00+01:00",
+    "end_time": "2026-11-02T11:00:00+01:00",
+    "rrule": "FREQ=WEEKLY;COUNT=4",
+}
+
+
+def create_weekly(client, channel):
+    response = client.post(f"/api/channels/channels/{channel}/events", json=WEEKLY)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_aware_times_are_stored_as_utc(client, channel):
+    event = create_weekly(client, channel)
+    assert event["start_time"] == "2026-11-02T09:00:00"
+    assert event["recurrence_end"] == "2026-11-23T10:00:00"
+
+
+def test_window_accepts_aware_bounds(client, channel):
+    create_weekly(client, channel)
+    response = client.get(
+        f"/api/channels/channels/{channel}/events",
+        params={"from": "2026-11-09T00:00:00Z", "to": "2026-11-17T00:00:00+01:00"},
+    )
+    assert response.status_code == 200, response.text
+    starts = [item["start_time"] for item in response.json()["items"]]
+    assert starts == ["2026-11-09T09:00:00", "2026-11-16T09:00:00"]
+
+
+def test_occurrence_path_accepts_aware_start(client, channel):
+    event = create_weekly(client, channel)
+    occurrence = f"/api/channels/events/{event['id']}/occurrences"
+    moved = client.put(
+        f"{occurrence}/2026-11-09T10:00:00+01:00",
+        json={"start_time": "2026-11-10T09:00:00Z", "end_time": "2026-11-10T10:00:00Z"},
+    )
+    assert moved.status_code == 200, moved.text
+    cancelled = client.delete(f"{occurrence}/2026-11-16T09:00:00Z")
+    assert cancelled.status_code == 204, cancelled.text
+
+    response = client.get(
+        f"/api/channels/channels/{channel}/events",
+        params={"from": "2026-11-01T00:00:00Z", "to": "2026-12-01T00:00:00Z"},
+    )
+    starts = [item["start_time"] for item in response.json()["items"]]
+    assert starts == [
+        "2026-11-02T09:00:00",
+        "2026-11-10T09:00:00",
+        "2026-11-23T09:00:00",
+    ]
+
+
+def test_availability_accepts_aware_bounds(client, channel):
+    create_weekly(client, channel)
+    response = client.get(
+        "/api/channels/behaviorists/behaviorist-1/availability",
+        params={"from": "2026-11-09T00:00:00Z", "to": "2026-11-17T00:00:00+01:00"},
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["busy"] == [
+        {"start_time": "2026-11-09T09:00:00", "end_time": "2026-11-09T10:00:00"},
+        {"start_time": "2026-11-16T09:00:00", "end_time": "2026-11-16T10:00:00"},
+    ]
+
+
+def test_conflicts_accept_aware_bounds(client, channel):
+    create_weekly(client, channel)
+    client.post(
+        f"/api/channels/channels/{channel}/events",
+        json={
+            "title": "Vet",
+            "start_time": "2026-11-09T09:30:00Z",
+            "end_time": "2026-11-09T10:30:00Z",
+        },
+    )
+    response = client.get(
+        "/api/channels/behaviorists/behaviorist-1/conflicts",
+        params={"from": "2026-11-01T00:00:00+01:00", "to": "2026-12-01T00:00:00Z"},
+    )
+    assert response.status_code == 200, response.text
+    assert [
+        (c["first"]["title"], c["second"]["title"]) for c in response.json()
+    ] == [("Walk", "Vet")]
+
+
+def test_zero_length_event_is_in_window(client, channel):
+    point = {
+        "title": "Reminder",
+        "start_time": "2026-11-05T12:00:00",
+        "end_time": "2026-11-05T12:00:00",
+    }
+    assert client.post(f"/api/channels/channels/{channel}/events", json=point).status_code == 200
+    response = client.get(
+        f"/api/channels/channels/{channel}/events",
+        params={"from": "2026-11-05T00:00:00", "to": "2026-11-06T00:00:00"},
+    )
+    assert [item["title"] for item in response.json()["items"]] == ["Reminder"]
+
+
+def test_occurrence_moved_past_the_series_end_is_in_window(client, channel):
+    event = create_weekly(client, channel)
+    moved = client.put(
+        f"/api/channels/events/{event['id']}/occurrences/2026-11-23T09:00:00",
+        json={"start_time": "2026-11-25T09:00:00", "end_time": "2026-11-25T10:00:00"},
+    )
+    assert moved.status_code == 200, moved.text
+    response = client.get(
+        f"/api/channels/channels/{channel}/events",
+        params={"from": "2026-11-25T00:00:00", "to": "2026-11-26T00:00:00"},
+    )
+    assert [item["recurrence_id"] for item in response.json()["items"]] == [
+        "2026-11-23T09:00:00"
+    ]
+
+    early = client.put(
+        f"/api/channels/events/{event['id']}/occurrences/2026-11-02T09:00:00",
+        json={"start_time": "2026-10-30T09:00:00", "end_time": "2026-10-30T10:00:00"},
+    )
+    assert early.status_code == 200, early.text
+    response = client.get(
+        "/api/channels/behaviorists/behaviorist-1/availability",
+        params={"from": "2026-10-30T00:00:00", "to": "2026-10-31T00:00:00"},
+    )
+    assert response.json()["busy"] == [
+        {"start_time": "2026-10-30T09:00:00", "end_time": "2026-10-30T10:00:00"}
+    ]
@@ -0,0 +1,97 @@
+import uuid
+
+import pytest
+from sqlalchemy import delete, func
+from sqlalchemy.future import select
+
+from app import indexer
+from app.db import SessionLocal
+from app.models import SearchOutbox
+from app.outbox import DELETE_CHANNEL, INDEX
+from app.search import EVENTS_INDEX, POSTS_INDEX
+from tests import fake_elasticsearch
+from tests.fake_elasticsearch import FakeElasticsearch
+
+
+@pytest.fixture
+def es(portal, monkeypatch):
+    async def clear_outbox():
+        async with SessionLocal() as db:
+            await db.execute(delete(SearchOutbox))
+            await db.commit()
+
+    portal.call(clear_outbox)
+    monkeypatch.setattr(indexer, "async_bulk", fake_elasticsearch.async_bulk)
+    return FakeElasticsearch()
+
+
+def stage(portal, *entries):
+    async def insert():
+        async with SessionLocal() as db:
+            db.add_all(SearchOutbox(**entry) for entry in entries)
+            await db.commit()
+
+    portal.call(insert)
+
+
+def post_entry(channel_id):
+    post_id = str(uuid.uuid4())
+    document = {"kind": "post", "channel_id": channel_id, "title": "Hello"}
+    return {
+        "index": POSTS_INDEX,
+        "document_id": post_id,
+        "operation": INDEX,
+        "document": document,
+    }
+
+
+def channel_delete_entry(channel_id):
+    return {"index": "*", "document_id": channel_id, "operation": DELETE_CHANNEL}
+
+
+def test_channel_delete_sees_documents_from_the_same_batch(portal, es):
+    channel_id = str(uuid.uuid4())
+    stage(portal, post_entry(channel_id), channel_delete_entry(channel_id))
+    assert portal.call(indexer.drain_outbox, es) == 2
+    assert es.documents[POSTS_INDEX] == {}
+
+
+def test_late_write_for_a_deleted_channel_is_cleaned_up(portal, es):
+    # the channel's delete entry was drained first, by another drainer
+    channel_id = str(uuid.uuid4())
+    stage(portal, channel_delete_entry(channel_id))
+    assert portal.call(indexer.drain_outbox, es) == 1
+    stage(portal, post_entry(channel_id))
+    assert portal.call(indexer.drain_outbox, es) == 1
+    assert es.documents[POSTS_INDEX] == {}
+
+
+def test_documents_of_live_channels_are_kept(portal, es, channel):
+    entry = post_entry(channel)
+    stage(portal, entry)
+    assert portal.call(indexer.drain_outbox, es) == 1
+    assert list(es.documents[POSTS_INDEX]) == [entry["document_id"]]
+
+
+def test_reindex_pauses_only_its_index(portal, es, channel):
+    from app.db import engine
+
+    post, event = post_entry(channel), post_entry(channel)
+    event.update(index=EVENTS_INDEX, document={**event["document"], "kind": "event"})
+    stage(portal, post, event, channel_delete_entry(str(uuid.uuid4())))
+    key = (indexer.OUTBOX_LOCK_KEY, indexer.index_lock_key(POSTS_INDEX))
+
+    async def drain_while_posts_reindex():
+        async with engine.connect() as connection:
+            await connection.execute(select(func.pg_advisory_lock(*key)))
+            try:
+                return await indexer.drain_outbox(es)
+            finally:
+                await connection.execute(select(func.pg_advisory_unlock(*key)))
+
+    assert portal.call(drain_while_posts_reindex) == 1
+    assert list(es.documents[EVENTS_INDEX]) == [event["document_id"]]
+    assert POSTS_INDEX not in es.documents
+    # the post and the channel delete waited for the reindex
+    assert portal.call(indexer.drain_outbox, es) == 2
+    assert list(es.documents[POSTS_INDEX]) == [post["document_id"]]
@@ -0,0 +1,201 @@
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from minio.error import S3Error
+from sqlalchemy import delete, update
+from sqlalchemy.future import select
+
+from app import media_store, routers
+from app.db import SessionLocal
+from app.models import Media, MediaObject, PendingUpload, Post
+
+POST = {"title": "Hello", "content": "First post", "author_id": "behaviorist-1"}
+
+
+def add_media(portal, post_id, key, count=1):
+    async def insert():
+        async with SessionLocal() as db:
+            db.add_all(
+                Media(post_id=post_id, file_path=key, created_by="behaviorist-1")
+                for _ in range(count)
+            )
+            await db.commit()
+
+    portal.call(insert)
+
+
+def ref_count(portal, key):
+    async def fetch():
+        async with SessionLocal() as db:
+            result = await db.execute(
+                select(MediaObject.ref_count).where(MediaObject.key == key)
+            )
+            return result.scalar()
+
+    return portal.call(fetch)
+
+
+def delete_post(portal, post_id):
+    async def run():
+        async with SessionLocal() as db:
+            await db.execute(delete(Post).where(Post.id == post_id))
+            await db.commit()
+
+    portal.call(run)
+
+
+def collect(portal, monkeypatch):
+    """Run the media GC to completion; returns the object keys it removed."""
+    removed = []
+
+    async def remove_stored(object_name):
+        removed.append(object_name)
+
+    monkeypatch.setattr(media_store, "_remove_stored", remove_stored)
+    while portal.call(media_store.collect_unreferenced):
+        pass
+    return removed
+
+
+def test_cascading_delete_releases_references(client, channel, portal, monkeypatch):
+    post = client.post(f"/api/channels/channels/{channel}/posts", json=POST).json()
+    key = f"sha256/{uuid.uuid4().hex}"
+    add_media(portal, post["id"], key, count=2)
+    assert ref_count(portal, key) == 2
+
+    delete_post(portal, post["id"])
+    assert ref_count(portal, key) == 0
+    assert key in collect(portal, monkeypatch)
+    assert ref_count(portal, key) is None
+
+
+def test_object_shared_by_another_post_is_kept(client, channel, portal, monkeypatch):
+    first = client.post(f"/api/channels/channels/{channel}/posts", json=POST).json()
+    second = client.post(f"/api/channels/channels/{channel}/posts", json=POST).json()
+    key = f"sha256/{uuid.uuid4().hex}"
+    add_media(portal, first["id"], key)
+    add_media(portal, second["id"], key)
+
+    delete_post(portal, first["id"])
+    assert ref_count(portal, key) == 1
+    assert key not in collect(portal, monkeypatch)
+    assert ref_count(portal, key) == 1
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    """Object name -> size, standing in for the bucket."""
+    objects = {}
+
+    async def stat_object(object_name):
+        if object_name not in objects:
+            raise S3Error("NoSuchKey", "missing", object_name, "", "", None)
+        return SimpleNamespace(size=objects[object_name])
+
+    async def remove_object(object_name):
+        objects.pop(object_name, None)
+
+    async def process_media_variants(media_id, channel_id):
+        pass
+
+    monkeypatch.setattr(routers, "stat_object", stat_object)
+    monkeypatch.setattr(routers, "_process_media_variants", process_media_variants)
+    monkeypatch.setattr(media_store, "remove_object", remove_object)
+    return objects
+
+
+def request_upload(client, channel, size=3):
+    post = client.post(f"/api/channels/channels/{channel}/posts", json=POST).json()
+    response = client.post(
+        f"/api/channels/posts/{post['id']}/media/upload_url",
+        json={"filename": "../photo.jpg", "size": size},
+    )
+    assert response.status_code == 200, response.text
+    return post["id"], response.json()
+
+
+def confirm(client, post_id, object_name):
+    return client.post(
+        f"/api/channels/posts/{post_id}/media/confirm", json={"object_name": object_name}
+    )
+
+
+def pending(portal, object_name):
+    async def fetch():
+        async with SessionLocal() as db:
+            return await db.get(PendingUpload, object_name)
+
+    return portal.call(fetch)
+
+
+def test_upload_url_is_signed_for_a_key_under_the_post(client, channel, portal):
+    post_id, upload = request_upload(client, channel)
+    assert upload["object_name"].startswith(f"{post_id}/")
+    assert upload["object_name"].endswith("_photo.jpg")
+    assert f"/{upload['object_name']}?" in upload["upload_url"]
+    assert "X-Amz-Signature=" in upload["upload_url"]
+    assert pending(portal, upload["object_name"]).size == 3
+
+
+def test_confirm_records_media_once(client, channel, portal, storage):
+    post_id, upload = request_upload(client, channel)
+    storage[upload["object_name"]] = 3
+    response = confirm(client, post_id, upload["object_name"])
+    assert response.status_code == 200, response.text
+    assert response.json()["file_path"] == upload["object_name"]
+    assert ref_count(portal, upload["object_name"]) == 1
+    assert pending(portal, upload["object_name"]) is None
+
+    assert confirm(client, post_id, upload["object_name"]).status_code == 404
+
+
+def test_confirm_rejects_a_wrong_key(client, channel, storage):
+    post_id, upload = request_upload(client, channel)
+    other_post, _ = request_upload(client, channel)
+    storage[upload["object_name"]] = 3
+    assert confirm(client, other_post, upload["object_name"]).status_code == 400
+    unknown = f"{post_id}/{uuid.uuid4()}_photo.jpg"
+    storage[unknown] = 3
+    assert confirm(client, post_id, unknown).status_code == 404
+
+
+def test_confirm_of_a_missing_object_keeps_the_upload_pending(
+    client, channel, portal, storage
+):
+    post_id, upload = request_upload(client, channel)
+    response = confirm(client, post_id, upload["object_name"])
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Uploaded object not found"
+    assert pending(portal, upload["object_name"]) is not None
+    assert ref_count(portal, upload["object_name"]) is None
+
+
+def test_confirm_rejects_a_size_mismatch(client, channel, portal, storage):
+    post_id, upload = request_upload(client, channel, size=3)
+    storage[upload["object_name"]] = 4096
+    response = confirm(client, post_id, upload["object_name"])
+    assert response.status_code == 400
+    assert pending(portal, upload["object_name"]) is not None
+
+
+def test_expired_uploads_are_removed(client, channel, portal, storage):
+    _, upload = request_upload(client, channel)
+    _, fresh = request_upload(client, channel)
+    storage[upload["object_name"]] = storage[fresh["object_name"]] = 3
+
+    async def expire():
+        async with SessionLocal() as db:
+            await db.execute(
+                update(PendingUpload)
+                .where(PendingUpload.object_name == upload["object_name"])
+                .values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+            )
+            await db.commit()
+
+    portal.call(expire)
+    while portal.call(media_store.collect_expired_uploads):
+        pass
+    assert list(storage) == [fresh["object_name"]]
+    assert pending(portal, upload["object_name"]) is None
@@ -0,0 +1,51 @@
+"""Round trips of the endpoints that fold the access check into the data query."""
+
+POST = {"title": "Hello", "content": "First post", "author_id": "behaviorist-1"}
+
+
+def test_list_posts(client, channel, count_queries):
+    client.post(f"/api/channels/channels/{channel}/posts", json=POST)
+    with count_queries() as queries:
+        response = client.get(f"/api/channels/channels/{channel}/posts")
+    assert response.status_code == 200
+    assert [post["title"] for post in response.json()["items"]] == ["Hello"]
+    # the channel version for the ETag, then the access-scoped page
+    assert len(queries) == 2, queries
+
+
+def test_list_posts_not_member(client, channel, count_queries, current_user):
+    current_user["sub"] = "someone-else"
+    try:
+        with count_queries() as queries:
+            response = client.get(f"/api/channels/channels/{channel}/posts")
+    finally:
+        current_user["sub"] = "behaviorist-1"
+    assert response.status_code == 404
+    assert len(queries) == 1, queries
+
+
+def test_create_post(client, channel, count_queries):
+    with count_queries() as queries:
+        response = client.post(f"/api/channels/channels/{channel}/posts", json=POST)
+    assert response.status_code == 200
+    # INSERT ... SELECT with the access check, then the search outbox entry
+    assert len(queries) == 2, queries
+
+
+def test_update_channel(client, channel, count_queries):
+    with count_queries() as queries:
+        response = client.put(
+            f"/api/channels/channels/{channel}",
+            json={"name": "Renamed", "description": None},
+        )
+    assert response.status_code == 200
+    assert response.json()["name"] == "Renamed"
+    assert len(queries) == 1, queries
+
+
+def test_delete_channel(client, channel, count_queries):
+    with count_queries() as queries:
+        response = client.delete(f"/api/channels/channels/{channel}")
+    assert response.status_code == 204
+    # DELETE ... RETURNING, then the outbox entry and the sync tombstone
+    assert len(queries) == 3, queries
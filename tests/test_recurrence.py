@@ -0,0 +1,28 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.recurrence import is_occurrence, iter_starts, parse_rrule, series_end
+
+
+def test_byday_excluding_the_start_weekday_keeps_dtstart():
+    # a Wednesday start, repeating on Mondays
+    start = datetime(2026, 11, 4, 10)
+    rule = parse_rrule("FREQ=WEEKLY;BYDAY=MO;COUNT=2")
+    assert list(iter_starts(rule, start)) == [start, datetime(2026, 11, 9, 10)]
+
+    event = SimpleNamespace(start_time=start, rrule="FREQ=WEEKLY;BYDAY=MO;COUNT=2")
+    assert is_occurrence(event, start)
+    assert not is_occurrence(event, datetime(2026, 11, 16, 10))
+    assert series_end(start, datetime(2026, 11, 4, 11), event.rrule) == datetime(
+        2026, 11, 9, 11
+    )
+
+
+def test_byday_including_the_start_weekday():
+    start = datetime(2026, 11, 4, 10)
+    rule = parse_rrule("FREQ=WEEKLY;BYDAY=MO,WE;COUNT=3")
+    assert list(iter_starts(rule, start)) == [
+        start,
+        datetime(2026, 11, 9, 10),
+        datetime(2026, 11, 11, 10),
+    ]
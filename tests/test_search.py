@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from app import search
+from app.search import COMMENTS_INDEX, EVENTS_INDEX, POSTS_INDEX, search_documents
+from tests.fake_elasticsearch import FakeElasticsearch
+
+
+@pytest.fixture
+def es():
+    es = FakeElasticsearch()
+    es.write(POSTS_INDEX, "p1", {"kind": "post", "channel_id": "a", "title": "Leash walk"})
+    es.write(POSTS_INDEX, "p2", {"kind": "post", "channel_id": "a", "content": "walk twice"})
+    es.write(POSTS_INDEX, "p3", {"kind": "post", "channel_id": "b", "title": "Walk"})
+    es.write(COMMENTS_INDEX, "c1", {"kind": "comment", "channel_id": "a", "content": "walk"})
+    es.write(EVENTS_INDEX, "e1", {"kind": "event", "channel_id": "a", "title": "Vet"})
+    asyncio.run(es.indices.refresh())
+    return es
+
+
+def run_search(es, *args, **kwargs):
+    return asyncio.run(search_documents(es, *args, **kwargs))
+
+
+def test_results_are_limited_to_the_users_channels(es):
+    result = run_search(es, "walk", ["a"])
+    assert sorted(item["id"] for item in result["items"]) == ["c1", "p1", "p2"]
+    assert {item["channel_id"] for item in result["items"]} == {"a"}
+    assert run_search(es, "walk", []) == {"items": [], "total": 0, "next_offset": None}
+
+
+def test_kinds_select_indices(es):
+    result = run_search(es, "walk", ["a", "b"], kinds=["comment"])
+    assert [item["id"] for item in result["items"]] == ["c1"]
+
+
+def test_matches_are_highlighted(es):
+    (item,) = run_search(es, "leash", ["a"])["items"]
+    assert item["highlight"] == {"title": ["<em>Leash</em> walk"]}
+
+
+def test_next_offset_pages_through_hits(es):
+    first = run_search(es, "walk", ["a", "b"], kinds=["post"], limit=2)
+    assert first["total"] == 3 and first["next_offset"] == 2
+    last = run_search(es, "walk", ["a", "b"], kinds=["post"], offset=2, limit=2)
+    assert len(last["items"]) == 1 and last["next_offset"] is None
+    ids = [item["id"] for item in first["items"] + last["items"]]
+    assert sorted(ids) == ["p1", "p2", "p3"]
+
+
+def test_next_offset_stops_at_the_result_window(es, monkeypatch):
+    monkeypatch.setattr(search, "SEARCH_MAX_WINDOW", 2)
+    result = run_search(es, "walk", ["a", "b"], kinds=["post"], limit=2)
+    assert result["next_offset"] is None
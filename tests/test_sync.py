@@ -0,0 +1,99 @@
+from datetime import datetime
+
+from app.db import SessionLocal
+from app.models import Post
+
+POST = {"title": "Hello", "content": "First post", "author_id": "behaviorist-1"}
+EVENT = {
+    "title": "Walk",
+    "start_time": "2026-11-02T10:00:00",
+    "end_time": "2026-11-02T11:00:00",
+}
+
+
+def changes(client, channel, since=None, **params):
+    if since:
+        params["since"] = since
+    response = client.get(f"/api/channels/channels/{channel}/changes", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_delta_contains_only_later_writes(client, channel):
+    client.post(f"/api/channels/channels/{channel}/posts", json=POST)
+    full = changes(client, channel)
+    assert [post["title"] for post in full["posts"]] == ["Hello"]
+
+    client.post(f"/api/channels/channels/{channel}/posts", json={**POST, "title": "Again"})
+    delta = changes(client, channel, full["next_cursor"])
+    assert [post["title"] for post in delta["posts"]] == ["Again"]
+    assert delta["version"] > full["version"]
+
+    unchanged = changes(client, channel, delta["next_cursor"])
+    assert unchanged["posts"] == [] and unchanged["version"] == delta["version"]
+
+
+def test_delta_reports_deletions(client, channel):
+    event = client.post(f"/api/channels/channels/{channel}/events", json=EVENT).json()
+    cursor = changes(client, channel)["next_cursor"]
+    assert client.delete(f"/api/channels/events/{event['id']}").status_code == 204
+    delta = changes(client, channel, cursor)
+    assert [(d["entity_type"], d["entity_id"]) for d in delta["deleted"]] == [
+        ("event", event["id"])
+    ]
+
+
+def test_long_transaction_is_not_skipped(client, channel, portal):
+    """A write stamped long before it commits still reaches the next delta."""
+
+    async def scenario():
+        async with SessionLocal() as slow:
+            # created_at is the transaction start, long before the commit
+            slow.add(
+                Post(
+                    title="Slow",
+                    content="",
+                    channel_id=channel,
+                    author_id="behaviorist-1",
+                    created_at=datetime(2000, 1, 1),
+                )
+            )
+            await slow.flush()
+            before = await client._client.get(f"/api/channels/channels/{channel}/changes")
+            await slow.commit()
+        return before.json()
+
+    before = portal.call(scenario)
+    assert before["posts"] == []
+    delta = changes(client, channel, before["next_cursor"])
+    assert [post["title"] for post in delta["posts"]] == ["Slow"]
+
+
+def test_full_sync_is_paginated(client, channel):
+    for title in ["One", "Two", "Three"]:
+        client.post(f"/api/channels/channels/{channel}/posts", json={**POST, "title": title})
+    client.post(f"/api/channels/channels/{channel}/events", json=EVENT)
+
+    page = changes(client, channel, limit=2)
+    titles, events = [], []
+    while True:
+        assert len(page["posts"]) <= 2
+        titles += [post["title"] for post in page["posts"]]
+        events += page["events"]
+        if not page["has_more"]:
+            break
+        page = changes(client, channel, page["next_cursor"], limit=2)
+    assert titles == ["One", "Two", "Three"] and len(events) == 1
+
+    unchanged = changes(client, channel, page["next_cursor"])
+    assert unchanged["posts"] == [] and not unchanged["has_more"]
+
+
+def test_deleted_channel_is_only_reported_to_members(client, channel, current_user):
+    cursor = changes(client, channel)["next_cursor"]
+    assert client.delete(f"/api/channels/channels/{channel}").status_code == 204
+    url = f"/api/channels/channels/{channel}/changes"
+
+    assert client.get(url, params={"since": cursor}).status_code == 410
+    current_user["sub"] = "stranger"
+    assert client.get(url, params={"since": cursor}).status_code == 404
@@ -0,0 +1,99 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app import user_directory
+from app.user_directory import FakeDirectoryBackend, UserDirectory
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(
+        user_directory, "time", SimpleNamespace(monotonic=lambda: clock.now)
+    )
+    return clock
+
+
+@pytest.fixture
+def backend():
+    return FakeDirectoryBackend({"Ann@Example.com": "user-ann"})
+
+
+def test_concurrent_lookups_share_one_backend_call(backend):
+    directory = UserDirectory(backend)
+
+    async def lookups():
+        return await asyncio.gather(
+            *(directory.get_user_id("ann@example.com") for _ in range(10))
+        )
+
+    assert asyncio.run(lookups()) == ["user-ann"] * 10
+    assert backend.lookups == 1
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_lookup(backend):
+    directory = UserDirectory(backend)
+
+    async def lookups():
+        release = asyncio.Event()
+        find_user_id = backend.find_user_id
+
+        async def slow_find_user_id(email):
+            await release.wait()
+            return await find_user_id(email)
+
+        backend.find_user_id = slow_find_user_id
+        first = asyncio.ensure_future(directory.get_user_id("ann@example.com"))
+        second = asyncio.ensure_future(directory.get_user_id("ann@example.com"))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+        return await second
+
+    assert asyncio.run(lookups()) == "user-ann"
+    assert backend.lookups == 1
+
+
+def test_hits_are_cached_until_the_ttl(backend, clock):
+    directory = UserDirectory(backend, ttl=60)
+    assert asyncio.run(directory.get_user_id("ann@example.com")) == "user-ann"
+    assert asyncio.run(directory.get_user_id(" ANN@example.com ")) == "user-ann"
+    assert backend.lookups == 1
+
+    clock.now += 61
+    assert asyncio.run(directory.get_user_id("ann@example.com")) == "user-ann"
+    assert backend.lookups == 2
+
+
+def test_misses_are_cached_for_the_negative_ttl(backend, clock):
+    directory = UserDirectory(backend, ttl=60, negative_ttl=5)
+    assert asyncio.run(directory.get_user_id("bob@example.com")) is None
+    backend.users["bob@example.com"] = "user-bob"
+    assert asyncio.run(directory.get_user_id("bob@example.com")) is None
+    assert backend.lookups == 1
+
+    clock.now += 6
+    assert asyncio.run(directory.get_user_id("bob@example.com")) == "user-bob"
+    assert backend.lookups == 2
+
+
+def test_least_recently_used_entries_are_evicted(backend, clock):
+    backend.users.update({"bob@example.com": "user-bob", "cy@example.com": "user-cy"})
+    directory = UserDirectory(backend, maxsize=2)
+    for name in ("ann", "bob", "ann", "cy"):
+        asyncio.run(directory.get_user_id(f"{name}@example.com"))
+    assert backend.lookups == 3
+    # bob was the least recently used when cy came in
+    asyncio.run(directory.get_user_id("ann@example.com"))
+    asyncio.run(directory.get_user_id("bob@example.com"))
+    assert backend.lookups == 4
+
+
+def test_invalidate_forces_a_lookup(backend):
+    directory = UserDirectory(backend)
+    asyncio.run(directory.get_user_id("ann@example.com"))
+    directory.invalidate("Ann@example.com")
+    asyncio.run(directory.get_user_id("ann@example.com"))
+    assert backend.lookups == 2